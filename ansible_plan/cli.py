@@ -17,6 +17,7 @@
 # You should have received a copy of the  GNU Affero General Public License v3.0
 # along with this program; if not, see <https://www.gnu.org/licenses/agpl.html/>.
 
+import atexit
 import logging
 import logging.handlers
 import sys
@@ -31,17 +32,14 @@ import httpx
 import subprocess
 import time
 
-from .ui.stdout import StdoutWorkflowOutput
-from .ui.textual import TextualWorkflowOutput
-from ansible.cli.arguments import option_helpers as opt_help
-from ansible.parsing.splitter import parse_kv
-
 BACKEND_URL = "http://127.0.0.1:8001"
+# one client for all the calls to the backend, reusing its connection
+backend_client = httpx.Client(base_url=BACKEND_URL)
+atexit.register(backend_client.close)
 
 def define_logger(logging_dir, level):
     logger_file_path = os.path.join(logging_dir, 'main.log')
-    if not os.path.exists(os.path.dirname(logger_file_path)):
-        os.makedirs(os.path.dirname(logger_file_path))
+    os.makedirs(os.path.dirname(logger_file_path), exist_ok=True)
 
     logger = logging.getLogger('main')
     if level:
@@ -59,7 +57,7 @@ def define_logger(logging_dir, level):
 
 def check_and_start_backend(logger, logging_dir):
     try:
-        httpx.get(f"{BACKEND_URL}/health")
+        backend_client.get("/health")
         logger.info("Backend is already running.")
     except httpx.ConnectError:
         logger.info("Backend not running. Starting it now.")
@@ -81,19 +79,26 @@ def check_and_start_backend(logger, logging_dir):
             **popen_kwargs
         )
 
-        for _ in range(10):
+        # poll the backend quickly at first, backing off up to half a second, for 10 seconds at most
+        delay = 0.05
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
             try:
-                httpx.get(f"{BACKEND_URL}/health")
+                backend_client.get("/health")
                 logger.info("Backend started successfully.")
                 return process
             except httpx.ConnectError:
-                time.sleep(1)
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
         logger.error("Failed to start the backend.")
         sys.exit(1)
     return None
 
 
 def read_options():
+    # ansible is heavy to import, load it only once the options are read
+    from ansible.cli.arguments import option_helpers as opt_help
+
     parser = argparse.ArgumentParser(description='This programs mimics the AWX/Ansible Tower® workflows from command line.')
     parser.add_argument('workflow', type=str, help='Workflow file')
 
@@ -127,6 +132,9 @@ def read_options():
     parser.add_argument('--doubtful-mode', dest='doubtful_mode', action='store_true',
                         help='Ask for each node if should be started or skipped')
 
+    parser.add_argument('-mp', '--max-parallel-playbooks', dest='max_parallel_playbooks', default=0, type=int,
+                        help='The maximum number of playbooks run at the same time, 0 for no limit')
+
     # add extra vars parameter from ansible library
     opt_help.add_runtask_options(parser)
 
@@ -134,8 +142,14 @@ def read_options():
     parser.add_argument('--mode', default='stdout', choices=["stdout", "visual"],
                         help='Render the progress using textual or stdout.')
 
+    parser.add_argument('--refresh-min', dest='refresh_min', default=0.25, type=float,
+                        help='The minimum seconds between two refreshes of the output, used while the nodes change')
+
+    parser.add_argument('--refresh-max', dest='refresh_max', default=10, type=float,
+                        help='The maximum seconds between two refreshes of the output, reached while nothing changes')
+
     parser.add_argument('-d', '--draw', dest='draw_png', action='store_true',
-                        help='Output also a PNG of the graph inside the log folder')
+                        help='Output also a SVG of the graph inside the log folder')
 
     parser.add_argument('-dpi', '--draw-dpi', dest='draw_dpi', default=72, type=int,
                         help='Choose the dpi of the draw graph')
@@ -159,9 +173,11 @@ def read_options():
     return parser.parse_args()
 
 def keyvalue(value):
-    if '=' not in value:
+    # split on the first "=" only, the value can contain other ones
+    key, separator, value = value.partition('=')
+    if not separator:
         raise Exception('Key value malformatted: key=value, missing the "="')
-    return value.split('=')
+    return key, value
 
 def main():
     os.environ['TERM'] = 'xterm-256color'
@@ -176,11 +192,12 @@ def main():
 
     check_and_start_backend(logger, logging_dir)
 
+    from ansible.parsing.splitter import parse_kv
     extra_vars = {}
     for single_extra_vars in cmd_args.extra_vars:
         extra_vars.update(parse_kv(single_extra_vars))
 
-    input_templating = {x: y for [x, y] in cmd_args.input_templating}
+    input_templating = dict(cmd_args.input_templating)
 
     start_payload = {
         "workflow_file": os.path.abspath(cmd_args.workflow),
@@ -196,10 +213,12 @@ def main():
         "log_level": cmd_args.log_level,
         "verify_only": cmd_args.verify_only,
         "doubtful_mode": cmd_args.doubtful_mode,
+        "max_parallel_playbooks": cmd_args.max_parallel_playbooks,
+        "draw_graph": cmd_args.draw_png,
     }
 
     try:
-        response = httpx.post(f"{BACKEND_URL}/workflow", json=start_payload, timeout=30)
+        response = backend_client.post("/workflow", json=start_payload, timeout=30)
         response.raise_for_status()
         response_data = response.json()
         if response_data.get("status") == "reconnected":
@@ -235,6 +254,8 @@ def main():
 
 
     if cmd_args.mode == 'visual':
+        # textual is heavy to import, load it only when the visual mode is requested
+        from .ui.textual import TextualWorkflowOutput
         output = TextualWorkflowOutput(
             backend_url=BACKEND_URL,
             event=threading.Event(),
@@ -245,7 +266,7 @@ def main():
         output.run()
 
         try:
-            response = httpx.get(f"{BACKEND_URL}/workflow")
+            response = backend_client.get("/workflow")
             response.raise_for_status()
             status = response.json().get("status")
             if status == "running":
@@ -254,6 +275,7 @@ def main():
         except (httpx.ConnectError, httpx.HTTPStatusError):
             pass
     else:
+        from .ui.stdout import StdoutWorkflowOutput
         stdout_thread = StdoutWorkflowOutput(
             backend_url=BACKEND_URL,
             event=threading.Event(),
@@ -263,25 +285,28 @@ def main():
         )
         stdout_thread.start()
 
+        detach_requested = threading.Event()
+
         def signal_handler(sig, frame):
-            console.print("\nDetaching from workflow. The backend will continue to run.")
-            console.print("To re-attach, run the same command again.")
-            stdout_thread.event.set()
-            # wait for the thread to finish
-            stdout_thread.join()
-            sys.exit(0)
+            # only ask the output to stop, the main thread detaches once the output thread is over
+            detach_requested.set()
+            stdout_thread.detach()
 
         signal.signal(signal.SIGINT, signal_handler)
         stdout_thread.join()
+        if detach_requested.is_set():
+            console.print("\nDetaching from workflow. The backend will continue to run.")
+            console.print("To re-attach, run the same command again.")
+            sys.exit(0)
 
     # Shutdown logic
     try:
-        response = httpx.get(f"{BACKEND_URL}/workflow")
+        response = backend_client.get("/workflow")
         response.raise_for_status()
         status = response.json().get("status")
         if status != "running":
             logger.info("Workflow finished. Shutting down backend.")
-            httpx.post(f"{BACKEND_URL}/shutdown")
+            backend_client.post("/shutdown")
     except (httpx.ConnectError, httpx.HTTPStatusError) as e:
         logger.warning(f"Could not get workflow status or shutdown backend: {e}")
 
@@ -5,6 +5,18 @@ from .models import PNode, CNode, INode, BNode
 
 logger = logging.getLogger(__name__)
 
+_NODE_STYLES = {
+    # Round (ellipse), Light Gray
+    BNode: dict(shape='ellipse', fillcolor='#eeeeee'),
+    # Rounded rectangle, Pastel Blue
+    PNode: dict(shape='rect', style='filled,rounded', fillcolor='#e1f5fe'),
+    # Diamond, Pastel Orange
+    CNode: dict(shape='diamond', fillcolor='#ffe0b2', height='1', width='1'),
+    # Square rectangle (just filled, no rounded), Pastel Purple
+    INode: dict(shape='rect', style='filled', fillcolor='#f3e5f5'),
+}
+_DEFAULT_NODE_STYLE = dict(fillcolor='#ffffff')
+
 def generate_workflow_svg(workflow, output_path_prefix):
     '''
     Generate an SVG image of the workflow graph.
@@ -31,47 +43,20 @@ def generate_workflow_svg(workflow, output_path_prefix):
             if len(label) > 40:
                 label = label[:37] + "..."
 
+            # graphviz attributes of the node type, the start and end nodes keep their own color
+            attributes = dict(_NODE_STYLES.get(type(node_obj), _DEFAULT_NODE_STYLE))
             if node_id == '_s':
-                fillcolor = "#c8e6c9" # Pastel Green
+                attributes['fillcolor'] = "#c8e6c9" # Pastel Green
             elif node_id == '_e':
-                fillcolor = "#ffcdd2" # Pastel Red
-            else:
-                if isinstance(node_obj, BNode):
-                    fillcolor = "#eeeeee" # Light Gray
-                elif isinstance(node_obj, PNode):
-                    fillcolor = "#e1f5fe" # Pastel Blue
-                elif isinstance(node_obj, CNode):
-                    fillcolor = "#ffe0b2" # Pastel Orange
-                elif isinstance(node_obj, INode):
-                    fillcolor = "#f3e5f5" # Pastel Purple
-                else:
-                    fillcolor = '#ffffff'
-
-            if isinstance(node_obj, BNode):
-                # Round (ellipse)
-                dot.node(node_id, label, shape='ellipse', fillcolor=fillcolor)
-            elif isinstance(node_obj, PNode):
-                # Rounded rectangle
-                dot.node(node_id, label, shape='rect', style='filled,rounded', fillcolor=fillcolor)
-            elif isinstance(node_obj, CNode):
-                # Diamond
-                dot.node(node_id, label, shape='diamond', fillcolor=fillcolor, height='1', width='1')
-            elif isinstance(node_obj, INode):
-                # Square rectangle (just filled, no rounded)
-                dot.node(node_id, label, shape='rect', style='filled', fillcolor=fillcolor)
-            else:
-                # Fallback
-                dot.node(node_id, label, fillcolor=fillcolor)
+                attributes['fillcolor'] = "#ffcdd2" # Pastel Red
+            dot.node(node_id, label, **attributes)
 
         # Edges
         # We use the execution graph for visualization as it represents the logical flow
         # between tasks and blocks.
         graph = workflow.get_graph()
-        for u, v in graph.edges():
-            # We hide the _root node as it is used for internal hierarchy
-            if u == '_root' or v == '_root':
-                continue
-            dot.edge(u, v)
+        # We hide the _root node as it is used for internal hierarchy
+        dot.edges([(u, v) for u, v in graph.edges() if u != '_root' and v != '_root'])
 
         # Save
         dot.render(output_path_prefix, cleanup=True)
@@ -1,8 +1,9 @@
 import typing
 import warnings
 import threading
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-import time
 with warnings.catch_warnings():
     warnings.filterwarnings("ignore", message="networkx backend defined more than once: nx-loopback")
     import networkx as nx
@@ -12,26 +13,67 @@ import logging.handlers
 from .exceptions import AnsibleWorkflowDuplicateNodeId, AnsibleWorkflowPlaybookNodeCheck
 from .models import WorkflowStatus, NodeStatus, Node, BNode, PNode, CNode, INode, WorkflowEventType, WorkflowEvent, WorkflowListener
 
+# statuses of a playbook node whose run is over
+_PNODE_DONE_STATUSES = frozenset((NodeStatus.ENDED, NodeStatus.FAILED, NodeStatus.SKIPPED))
+# statuses of a node letting its next nodes run
+_NODE_DONE_STATUSES = frozenset((NodeStatus.ENDED, NodeStatus.SKIPPED))
+
 
 class AnsibleWorkflow():
-    def __init__(self, workflow_file, logging_dir, log_level, doubtful_mode: bool = False, filtered_nodes=None):
+    def __init__(self, workflow_file, logging_dir, log_level, doubtful_mode: bool = False, filtered_nodes=None,
+                 poll_interval_min: float = 0.05, poll_interval_max: float = 1):
         self.__graph: nx.DiGraph = nx.DiGraph()
         self.__original_graph: nx.DiGraph = nx.DiGraph()
+        # (number of edges, edges list) of the original graph last returned
+        self.__original_edges_cache = (0, [])
         self.__running_status = WorkflowStatus.NOT_STARTED
         self.__define_logger(logging_dir, log_level)
         self.__data = dict()
-        self.__running_nodes = []
+        # the node objects also stored in the data, looked up directly by the scheduler
+        self.__nodes: typing.Dict[str, Node] = {}
+        # insertion ordered, the values are not used
+        self.__running_nodes: typing.Dict[str, None] = {}
         self.__stopped = False
         self.__listeners: WorkflowListener = []
-        self.__skipped_nodes: typing.List[str] = []
+        # events waiting to be dispatched to the listeners, by a thread started with the first listener
+        self.__events_queue: queue.Queue = queue.Queue(maxsize=10000)
+        self.__events_dispatcher: typing.Optional[threading.Thread] = None
+        # last status notified for each node
+        self.__last_node_events: typing.Dict[str, NodeStatus] = {}
+        self.__skipped_nodes: typing.Set[str] = set()
+        # adjacency of the graph, built once the run starts as the graph does not change anymore
+        self.__successors: typing.Dict[str, typing.Tuple[str, ...]] = {}
+        self.__predecessors: typing.Dict[str, typing.Tuple[str, ...]] = {}
+        # nodes in topological order, sorted by the validation
+        self.__topological_order: typing.List[str] = []
+        # number of predecessors of each node not yet ended or skipped
+        self.__pending_predecessors: typing.Dict[str, int] = {}
+        # nodes already accounted as ended or skipped in the pending predecessors
+        self.__done_nodes: typing.Set[str] = set()
         self.__logging_dir = logging_dir
         self.__workflow_file = workflow_file
-        self.__resume_event = threading.Event()
         self._validation_errors = []
         self.__pause_event = threading.Event()
         self.__pause_event.set()
         self.__stopping = False
         self.__doubtful_mode = doubtful_mode
+        self.__draw_graph = False
+        self.__svg_generated = False
+        # the nodes are polled every poll_interval_min seconds after a change,
+        # backing off up to poll_interval_max seconds while nothing happens
+        self.__poll_interval_min = poll_interval_min
+        self.__poll_interval_max = poll_interval_max
+        # maximum number of playbooks run at the same time, no limit if not set
+        self.__max_running_playbooks: typing.Optional[int] = None
+        # playbook nodes started whose finished callback has not been received yet
+        self.__playbooks_in_flight: typing.Set[str] = set()
+        # playbook nodes waiting for a free slot to be run, in order
+        self.__queued_runs: typing.Dict[str, None] = {}
+        # playbook runs set up in the launcher threads, created with the first run
+        self.__launcher: typing.Optional[ThreadPoolExecutor] = None
+        self.__launching: typing.Dict[str, Future] = {}
+        # set to interrupt the wait between two steps
+        self.__wake_event = threading.Event()
 
     def get_validation_errors(self):
         return self._validation_errors
@@ -53,48 +95,99 @@ class AnsibleWorkflow():
             remaining_nodes = set(self.__graph.nodes) - set(filter_nodes)
             self.__skipped_nodes = remaining_nodes
 
+    def set_draw_graph(self, draw_graph: bool):
+        self.__draw_graph = draw_graph
+
+    def set_max_running_playbooks(self, max_running_playbooks: int):
+        if max_running_playbooks > 0:
+            self.__max_running_playbooks = max_running_playbooks
+
     def set_skipped_nodes(self, skipped_nodes: typing.List[str]):
         if len(skipped_nodes) > 0:
-            self.__skipped_nodes = skipped_nodes
+            self.__skipped_nodes = set(skipped_nodes)
 
     def __define_logger(self, logging_dir, level):
         logger_name = self.__class__.__name__
         logger_file_path = os.path.join(logging_dir, 'workflow.log')
-        if not os.path.exists(os.path.dirname(logger_file_path)):
-            os.makedirs(os.path.dirname(logger_file_path))
+        os.makedirs(os.path.dirname(logger_file_path), exist_ok=True)
 
         logger = logging.getLogger(logger_name)
         if level:
             logger.setLevel(getattr(logging, level.upper()))
-        logger_handler = logging.handlers.TimedRotatingFileHandler(
-            logger_file_path,
-            when='d',
-            backupCount=3,
-            encoding='utf8'
-        )
-        logger_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
-        logger.addHandler(logger_handler)
+        # the logger is shared by the workflows created in the same process: keep the handler
+        # if it already writes to the same file, otherwise replace the handler of the previous
+        # workflow, so that each line is written once
+        if not any(getattr(handler, 'baseFilename', None) == os.path.abspath(logger_file_path)
+                   for handler in logger.handlers):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            logger_handler = logging.handlers.TimedRotatingFileHandler(
+                logger_file_path,
+                when='d',
+                backupCount=3,
+                encoding='utf8'
+            )
+            logger_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+            logger.addHandler(logger_handler)
         self._logger = logger
 
     def add_event_listener(self, listener):
         self.__listeners.append(listener)
+        if self.__events_dispatcher is None:
+            self.__events_dispatcher = threading.Thread(target=self.__dispatch_events, daemon=True)
+            self.__events_dispatcher.start()
+
+    def __dispatch_events(self):
+        '''
+        Notify the listeners out of the run loop, so that a slow listener does not delay the nodes.
+        The events queued meanwhile are given to the listeners together
+        '''
+        while True:
+            events = [self.__events_queue.get()]
+            try:
+                while True:
+                    events.append(self.__events_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                for listener in self.__listeners:
+                    listener.notify_events(events)
+            except Exception:
+                self._logger.exception("Error notifying the events %s", [str(event_obj) for event_obj in events])
+            finally:
+                for _ in events:
+                    self.__events_queue.task_done()
+
+    def __flush_events(self):
+        if self.__events_dispatcher is not None:
+            self.__events_queue.join()
+
+    @staticmethod
+    def __check_node_input(node: PNode) -> typing.Optional[str]:
+        try:
+            node.check_node_input()
+        except AnsibleWorkflowPlaybookNodeCheck as e:
+            return str(e)
+        return None
 
     def is_valid(self):
-        for node_id in self.__graph.nodes:
-            if isinstance(self.__data[node_id]['object'], PNode):
-                try:
-                    self.__data[node_id]['object'].check_node_input()
-                except AnsibleWorkflowPlaybookNodeCheck as e:
-                    self._validation_errors.append(str(e))
+        # the checks only look for files, run them concurrently as they mostly wait for the filesystem
+        playbook_nodes = [node for node in self.__nodes.values() if isinstance(node, PNode)]
+        if len(playbook_nodes) > 1:
+            with ThreadPoolExecutor(max_workers=min(32, len(playbook_nodes))) as executor:
+                errors = list(executor.map(self.__check_node_input, playbook_nodes))
+        else:
+            errors = [self.__check_node_input(node) for node in playbook_nodes]
+        self._validation_errors.extend(error for error in errors if error is not None)
 
-        # search cycle
+        # search cycle sorting the graph, the sort is kept for the run and the cycle is searched only to report it
         try:
-            cycle = nx.find_cycle(self.__graph)
-            error = "The workflow is cyclic: %s" % cycle
+            self.__topological_order = list(nx.topological_sort(self.__graph))
+        except nx.NetworkXUnfeasible:
+            error = "The workflow is cyclic: %s" % nx.find_cycle(self.__graph)
             self._logger.error(error)
             self._validation_errors.append(error)
-        except nx.NetworkXNoCycle:
-            pass
 
         if self._validation_errors:
             self._logger.error(
@@ -107,16 +200,24 @@ class AnsibleWorkflow():
         return self.__original_graph
 
     def get_original_graph_edges(self) -> typing.List[typing.List[str]]:
-        return [[u, v] for u, v in self.__original_graph.edges()]
+        # edges are only added while loading, their number tells if the list is still valid
+        edges_count, edges = self.__original_edges_cache
+        if edges_count != self.__original_graph.number_of_edges() or not edges_count:
+            edges = [[u, v] for u, v in self.__original_graph.edges()]
+            self.__original_edges_cache = (len(edges), edges)
+        return edges
 
     def add_link(self, node_id: str, next_node_id: str):
         self.__graph.add_edge(node_id, next_node_id)
 
+    def add_links(self, links: typing.Iterable[typing.Tuple[str, str]]):
+        self.__graph.add_edges_from(links)
+
     def add_node(self, node: Node, other: dict = None):
         node.set_logger(self._logger)
 
         # check if the node already exists (is auto added if a link is added)
-        if (self.is_node_present(node.get_id()) and node.get_id() in self.__data) or ',' in node.get_id():
+        if node.get_id() in self.__nodes or ',' in node.get_id():
             if node.get_id() in ['_s', '_e', '_root']:
                 msg = "The node id %s name is reserved for internal purpose" % node.get_id()
             elif ',' in node.get_id():
@@ -137,24 +238,27 @@ class AnsibleWorkflow():
         # attach an instance of the Node class to the graph node
         node_data.update(dict(object=node))
         self.__data[node.get_id()] = node_data
+        self.__nodes[node.get_id()] = node
 
     def get_node_object(self, node_id: str) -> Node:
-        return self.__data[node_id]['object']
+        return self.__nodes[node_id]
 
     def notify_event(self, event_type: WorkflowEventType,
                      event: typing.Union[NodeStatus, WorkflowStatus],
                      content: typing.Any = None):
-        event_obj = WorkflowEvent(event_type, event, content)
-        self._logger.debug("Notifying TYPE: %s EVENT: %s CONTENT: %s" %
-                           (event_type, event, content))
+        if event_type == WorkflowEventType.NODE_EVENT:
+            # a node notified again with the same status is not a change
+            if self.__last_node_events.get(content.get_id()) == event:
+                return
+            self.__last_node_events[content.get_id()] = event
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("Notifying TYPE: %s EVENT: %s CONTENT: %s", event_type, event, content)
 
-        for listener in self.__listeners:
-            listener.notify_event(event_obj)
+        if self.__listeners:
+            self.__events_queue.put(WorkflowEvent(event_type, event, content))
 
     def is_node_present(self, node_id: str):
-        if node_id in self.__graph.nodes:
-            return True
-        return False
+        return node_id in self.__graph
 
     def get_node(self, node_id: str) -> typing.List[typing.Any]:
         return self.__graph.nodes[node_id], self.__data[node_id]
@@ -163,24 +267,58 @@ class AnsibleWorkflow():
         return self.__graph.nodes
 
     def is_node_runnable(self, node_id):
-        self._logger.debug("Check node %s can be run" % node_id)
-        in_edges = self.__graph.in_edges(node_id)
-        for edge in in_edges:
-            previous_node = edge[0]
-            self._logger.debug("\tPrevious node %s status: %s" % (previous_node, self.__data[previous_node]['object'].get_status()))
-            if self.__data[previous_node]['object'].get_status() not in [NodeStatus.ENDED, NodeStatus.SKIPPED]:
-                self._logger.debug("\tNot ended: %s" % previous_node)
-                return False
-        return True
+        self._logger.debug("Check node %s can be run, pending previous nodes: %s",
+                           node_id, self.__pending_predecessors[node_id])
+        return self.__pending_predecessors[node_id] == 0
+
+    def __freeze_adjacency(self):
+        '''
+        Copy the graph adjacency in plain tuples, faster to visit than the graph views
+        '''
+        # the successors are kept in topological order, so the nodes ready together are started in a stable order
+        topological_index = {node_id: index for index, node_id in enumerate(self.__topological_order)}
+        self.__successors = {node_id: tuple(sorted(self.__graph.successors(node_id), key=topological_index.__getitem__))
+                             for node_id in self.__graph.nodes}
+        self.__predecessors = {node_id: tuple(self.__graph.predecessors(node_id)) for node_id in self.__graph.nodes}
+
+    def __init_pending_predecessors(self):
+        '''
+        Count for each node the previous nodes not yet ended or skipped
+        '''
+        self.__done_nodes = set(node_id for node_id, node in self.__nodes.items()
+                                if node.get_status() in _NODE_DONE_STATUSES)
+        self.__pending_predecessors = {
+            node_id: sum(1 for previous_node in self.__predecessors[node_id] if previous_node not in self.__done_nodes)
+            for node_id in self.__graph.nodes
+        }
+
+    def __set_node_done(self, node_id) -> typing.List[str]:
+        '''
+        Account a node as ended or skipped for its next nodes, only once
+        Returns:
+            The next nodes having all their previous nodes ended or skipped, not yet started
+        '''
+        if node_id in self.__done_nodes:
+            # a node skipped from the start is already accounted, its next nodes have no previous nodes to wait for
+            return [next_node_id for next_node_id in self.__successors[node_id]
+                    if self.__pending_predecessors[next_node_id] == 0
+                    and next_node_id not in self.__done_nodes and next_node_id not in self.__running_nodes]
+        self.__done_nodes.add(node_id)
+        ready_nodes = []
+        for next_node_id in self.__successors[node_id]:
+            self.__pending_predecessors[next_node_id] -= 1
+            if self.__pending_predecessors[next_node_id] == 0:
+                ready_nodes.append(next_node_id)
+        return ready_nodes
 
     def is_running(self):
-        return len(self.__running_nodes) != 0
+        return bool(self.__running_nodes)
 
     def get_running_status(self):
         return self.__running_status
 
     def get_running_nodes(self):
-        return self.__running_nodes
+        return list(self.__running_nodes)
 
     def get_graph(self):
         return self.__graph
@@ -190,19 +328,69 @@ class AnsibleWorkflow():
 
     def run_node(self, node_id):
         node = self.get_node_object(node_id)
+        if isinstance(node, PNode):
+            if self.__max_running_playbooks and self.__count_running_playbooks() >= self.__max_running_playbooks:
+                self._logger.info("Node: %s - queued, %s playbooks already running", node, self.__max_running_playbooks)
+                self.__queued_runs[node_id] = None
+                return
+            # process the node as soon as its playbook is over
+            node.set_finished_callback(self.__on_node_finished)
+            self.__playbooks_in_flight.add(node_id)
+            # set up the runs in other threads, so the playbooks of a wide block start together
+            if self.__launcher is None:
+                self.__launcher = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='launcher')
+            self.__launching[node_id] = self.__launcher.submit(self.__launch_node, node)
+        else:
+            self.__launch_node(node)
+
+    def __launch_node(self, node: Node):
         node.run()
-        self._logger.info("Node: %s - %s - [ %s - ... ]" % (node, 'starting',
-                            node.get_telemetry()["started"]))
+        self._logger.info("Node: %s - %s - [ %s - ... ]", node, 'starting',
+                          node.get_telemetry()["started"])
         self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.RUNNING, node)
+        self.wake()
+
+    def __shutdown_launcher(self):
+        if self.__launcher is not None:
+            self.__launcher.shutdown(wait=True)
+            self.__launcher = None
+
+    def __count_running_playbooks(self):
+        return len(self.__playbooks_in_flight)
+
+    def __run_queued_nodes(self):
+        '''
+        Run the queued playbook nodes while there are free slots, or drop them if
+        the workflow is stopping
+        '''
+        while self.__queued_runs:
+            node_id = next(iter(self.__queued_runs))
+            if self.__stopping:
+                del self.__queued_runs[node_id]
+                self.__running_nodes.pop(node_id, None)
+            elif self.__count_running_playbooks() < self.__max_running_playbooks:
+                del self.__queued_runs[node_id]
+                self.run_node(node_id)
+            else:
+                break
+
+    def __on_node_finished(self, node: PNode):
+        self._logger.debug("Node %s playbook run finished", node.get_id())
+        self.__playbooks_in_flight.discard(node.get_id())
+        self.wake()
 
     def skip_node(self, node_id):
         node = self.get_node_object(node_id)
-        self._logger.info("Node: %s - %s - [ %s - ... ]" % (node, 'skipped',
-                            node.get_telemetry()["started"]))
+        self._logger.info("Node: %s - %s - [ %s - ... ]", node, 'skipped',
+                          node.get_telemetry()["started"])
         self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.SKIPPED, node)
 
     def add_running_node(self, node_id):
-        self.__running_nodes.append(node_id)
+        self.__running_nodes[node_id] = None
+
+    def wake(self):
+        ''' Make the run loop process the nodes without waiting for the poll interval'''
+        self.__wake_event.set()
 
     def is_stopping(self):
         return self.__stopped
@@ -218,6 +406,7 @@ class AnsibleWorkflow():
                 if isinstance(node, PNode):
                     node.stop()
         self.__pause_event.set()
+        self.wake()
 
     def pause(self):
         self._logger.info("Pausing workflow")
@@ -230,51 +419,82 @@ class AnsibleWorkflow():
         self.__running_status = WorkflowStatus.RUNNING
         self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, "Workflow resumed")
         self.__pause_event.set()
+        self.wake()
 
     def _is_waiting_for_confirmation(self):
-        for node_id in self.get_nodes():
-            if self.get_node_object(node_id).get_status() == NodeStatus.AWAITING_CONFIRMATION:
+        for node in self.__nodes.values():
+            if node.get_status() == NodeStatus.AWAITING_CONFIRMATION:
                 return True
         return False
 
     def get_some_failed_task(self):
-        some_failed_tasks = False
-        for node_id in self.get_nodes():
-            if self.get_node_object(node_id).get_status() not in [NodeStatus.ENDED, NodeStatus.SKIPPED]:
-                # print('--nodeid({}) KO {}'.format(node_id, self.get_node_object(node_id).get_status()))
-                some_failed_tasks = True
-            else:
-                # print('--nodeid({}) ok {}'.format(node_id, self.get_node_object(node_id).get_status()))
-                pass
-        return some_failed_tasks
+        # the nodes accounted as done for their next nodes stay ended or skipped, only the others are checked
+        if len(self.__done_nodes) == len(self.__nodes):
+            return False
+        return any(node.get_status() not in _NODE_DONE_STATUSES
+                   for node_id, node in self.__nodes.items() if node_id not in self.__done_nodes)
 
-    def __run_step(self, end_node="_e"):
-        self._logger.debug(f"__run_step: running_nodes={self.__running_nodes}")
-        for node_id in list(self.__running_nodes):
+    def __run_step(self, end_node="_e", full_sweep: bool = True) -> bool:
+        '''
+        Process the running nodes once, starting the nodes that can be run
+        Args:
+            end_node (string): The identifier of the ending node for the graph
+            full_sweep (bool): Check also the playbooks whose finished callback has not been received
+        Returns:
+            True if some node changed its state, False otherwise
+        '''
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("__run_step: running_nodes=%s", list(self.__running_nodes))
+        changed = False
+        if self.__queued_runs:
+            self.__run_queued_nodes()
+        # the API threads can add running nodes while stepping, so a snapshot is visited
+        for node_id in tuple(self.__running_nodes):
+            # most of the running nodes are playbooks in flight, skip them first
+            if not full_sweep and node_id in self.__playbooks_in_flight:
+                continue
+            if node_id in self.__queued_runs:
+                continue
             node = self.get_node_object(node_id)
+            launch = self.__launching.get(node_id)
+            if launch is not None:
+                if not launch.done():
+                    continue
+                del self.__launching[node_id]
+                try:
+                    launch.result()
+                except Exception:
+                    # a playbook that cannot be started fails alone, freeing its running slot
+                    self._logger.exception("Node %s cannot be started", node_id)
+                    self.__playbooks_in_flight.discard(node_id)
+                    node.set_status(NodeStatus.FAILED)
+                    self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.FAILED, node)
             status = node.get_status()
-            self._logger.debug(f"__run_step: processing node {node_id} with status {status}")
+            if status != NodeStatus.RUNNING:
+                # the runner thread could have ended without calling the finished callback
+                self.__playbooks_in_flight.discard(node_id)
+            self._logger.debug("__run_step: processing node %s with status %s", node_id, status)
+            if status != NodeStatus.RUNNING or isinstance(node, CNode):
+                changed = True
             # if current node is ended search for next nodes
             if isinstance(node, CNode) and status == NodeStatus.RUNNING:
                 node.set_status(NodeStatus.ENDED)
             elif isinstance(node, (BNode, INode)) and status == NodeStatus.NOT_STARTED:
                 node.set_status(NodeStatus.ENDED)
                 self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.ENDED, node)
-            elif status in [NodeStatus.ENDED, NodeStatus.SKIPPED]:
-                self._logger.info(f"Node {node_id} finished with status {status}. Setting end time.")
-                self.__running_nodes.remove(node_id)
+            elif status in _NODE_DONE_STATUSES:
+                self._logger.info("Node %s finished with status %s. Setting end time.", node_id, status)
+                self.__running_nodes.pop(node_id, None)
                 if not node.is_skipped():
                     node.set_ended_time(datetime.now())
                     self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.ENDED, node)
-
-                for out_edge in self.__graph.out_edges(node_id):
-                    next_node_id = out_edge[1]
+                # only the next nodes whose last pending previous node was this one can be started
+                for next_node_id in self.__set_node_done(node_id):
                     next_node = self.get_node_object(next_node_id)
 
-                    # check if a node as previous nodes ended and not already started
-                    if self.is_node_runnable(next_node_id) and next_node_id not in self.__running_nodes:
+                    if next_node_id not in self.__running_nodes:
                         if next_node_id != end_node and not self.__stopping:
-                            self.__running_nodes.append(next_node_id)
+                            self.__running_nodes[next_node_id] = None
                             if isinstance(next_node, PNode):
                                 # run a node
                                 self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.PRE_RUNNING, next_node)
@@ -300,23 +520,51 @@ class AnsibleWorkflow():
 
             elif status == NodeStatus.AWAITING_CONFIRMATION:
                 self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.AWAITING_CONFIRMATION, node)
-                self.__running_nodes.remove(node_id)
+                self.__running_nodes.pop(node_id, None)
             elif status == NodeStatus.STOPPED:
                 self._logger.info(f"Node {node_id} stopped. Setting end time.")
                 node.set_ended_time(datetime.now())
                 self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.STOPPED, node)
-                self.__running_nodes.remove(node_id)
+                self.__running_nodes.pop(node_id, None)
             elif status == NodeStatus.FAILED:
                 # just remove a failed node
                 # print("Failed node %s" % node_id)
                 node.set_ended_time(datetime.now())
                 self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.FAILED, node)
-                self.__running_nodes.remove(node_id)
+                self.__running_nodes.pop(node_id, None)
                 # Do not set workflow status to FAILED here, to allow for retry.
 
-            if isinstance(node, PNode) and node.get_status() in ['ended', 'failed', 'skipped']:
-                self._logger.info("Node: %s - %s - [ %s - %s]" % (node_id, node.get_status(),
-                                  node.get_telemetry()['started'], node.get_telemetry()['ended']))
+            # the branches above do not change the status of a playbook node
+            if isinstance(node, PNode) and status in _PNODE_DONE_STATUSES:
+                telemetry = node.get_telemetry()
+                self._logger.info("Node: %s - %s - [ %s - %s]", node_id, status,
+                                  telemetry['started'], telemetry['ended'])
+        return changed
+
+    def __wait_wake(self, timeout: float) -> bool:
+        '''
+        Wait for the timeout or until woken up, returning True in the latter case
+        '''
+        woken = self.__wake_event.wait(timeout)
+        self.__wake_event.clear()
+        return woken
+
+    @staticmethod
+    def __reachable_nodes(node_id: str, adjacency: typing.Dict[str, typing.Tuple[str, ...]]) -> typing.Set[str]:
+        '''
+        Return the nodes reachable from a node following the frozen adjacency, the node excluded,
+        or no nodes if the node is not in the graph
+        '''
+        reached = set()
+        to_be_visited = list(adjacency.get(node_id, ()))
+        while to_be_visited:
+            actual_node_id = to_be_visited.pop()
+            if actual_node_id not in reached:
+                reached.add(actual_node_id)
+                # the shared descendants of a diamond are not stacked again
+                to_be_visited.extend(next_node_id for next_node_id in adjacency[actual_node_id]
+                                     if next_node_id not in reached)
+        return reached
 
     def _set_skipped_nodes(self, start_node: str, end_node: str):
         '''
@@ -326,26 +574,13 @@ class AnsibleWorkflow():
             start_node (string): The identifier of the starting node for the graph
             end_node (string): The identifier of the ending node for the graph
         '''
-        # set skipped nodes from filtered nodes
-        for node in self.__skipped_nodes:
-            self.get_node_object(node).set_skipped()
-        # skipped from start
-        self._logger.info("Setting skipped %s" % self.__graph.in_edges(start_node))
-        skipped_from_start = [s for s, _ in self.__graph.in_edges(start_node)]
-        while len(skipped_from_start) > 0:
-            actual_node_id = skipped_from_start.pop()
-            actual_node = self.get_node_object(actual_node_id)
-            actual_node.set_skipped()
-            for prev, _ in self.__graph.in_edges(actual_node.get_id()):
-                skipped_from_start.append(prev)
-
-        skipped_after_end = [e for _, e in self.__graph.out_edges(end_node)]
-        while len(skipped_after_end) > 0:
-            actual_node_id = skipped_after_end.pop()
-            actual_node = self.get_node_object(actual_node_id)
-            actual_node.set_skipped()
-            for _, next in self.__graph.out_edges(actual_node.get_id()):
-                skipped_after_end.append(next)
+        # filtered nodes, nodes before the start and nodes after the end, each visited once
+        skipped_nodes = (self.__skipped_nodes
+                         | self.__reachable_nodes(start_node, self.__predecessors)
+                         | self.__reachable_nodes(end_node, self.__successors))
+        self._logger.info("Setting skipped %s", skipped_nodes)
+        for node_id in skipped_nodes:
+            self.get_node_object(node_id).set_skipped()
 
     def restart_failed_node(self, node_id: str):
         node = self.get_node_object(node_id)
@@ -364,7 +599,7 @@ class AnsibleWorkflow():
 
         self.run_node(node_id)
         self.add_running_node(node_id)
-        self.__resume_event.set()
+        self.wake()
 
     def skip_failed_node(self, node_id: str):
         node = self.get_node_object(node_id)
@@ -384,7 +619,7 @@ class AnsibleWorkflow():
 
         # Add node to running nodes so its successors can be processed
         self.add_running_node(node_id)
-        self.__resume_event.set()
+        self.wake()
 
     def approve_node(self, node_id: str):
         node = self.get_node_object(node_id)
@@ -399,6 +634,7 @@ class AnsibleWorkflow():
         else:
             self.run_node(node_id)
         self.add_running_node(node_id)
+        self.wake()
 
     def disapprove_node(self, node_id: str):
         node = self.get_node_object(node_id)
@@ -414,7 +650,7 @@ class AnsibleWorkflow():
             node.set_status(NodeStatus.SKIPPED)
             self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.SKIPPED, node)
             self.add_running_node(node_id)
-
+        self.wake()
 
 
     def run(self, start_node: str = "_s", end_node: str = "_e", verify_only: bool = False):
@@ -427,15 +663,17 @@ class AnsibleWorkflow():
 
         '''
 
-        # Generate the graph image
-        try:
-            from .drawer import generate_workflow_svg
-            output_path = os.path.join(self.__logging_dir, 'workflow')
-            generate_workflow_svg(self, output_path)
-        except ImportError:
-            self._logger.warning("graphviz not installed, skipping workflow SVG generation")
-        except Exception as e:
-            self._logger.error(f"Error generating workflow SVG: {e}")
+        # Generate the graph image when requested, once as the graph does not change
+        if self.__draw_graph and not self.__svg_generated:
+            self.__svg_generated = True
+            try:
+                from .drawer import generate_workflow_svg
+                output_path = os.path.join(self.__logging_dir, 'workflow')
+                generate_workflow_svg(self, output_path)
+            except ImportError:
+                self._logger.warning("graphviz not installed, skipping workflow SVG generation")
+            except Exception as e:
+                self._logger.error(f"Error generating workflow SVG: {e}")
 
         # perform validation of the
         if not self.is_valid():
@@ -466,20 +704,28 @@ class AnsibleWorkflow():
             self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, error)
             return
 
+        self.__freeze_adjacency()
         self._set_skipped_nodes(start_node, end_node)
+        self.__init_pending_predecessors()
         start_node_object = self.get_node_object(start_node)
         self.__running_status = WorkflowStatus.RUNNING
         self.add_running_node(start_node)
         self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, start_node)
 
         if isinstance(start_node_object, PNode):
-            self.notify_event(WorkflowEventType.NODE_EVENT, NodeStatus.RUNNING, start_node_object)
+            # the running event is notified once the node is started
             self.run_node(start_node)
 
-        # loop over nodes
+        # loop over nodes, polling them more often right after a change
+        poll_interval = self.__poll_interval_min
+        woken = False
         while not self.__stopped:
             self.__pause_event.wait()
-            self.__run_step(end_node)
+            # the running playbooks are checked only when their callback has not woken the loop
+            if self.__run_step(end_node, full_sweep=not woken):
+                poll_interval = self.__poll_interval_min
+            else:
+                poll_interval = min(self.__poll_interval_max, poll_interval * 2)
 
             if not self.is_running():
                 if self.__stopping:
@@ -489,23 +735,28 @@ class AnsibleWorkflow():
                     if self.__running_status != WorkflowStatus.PAUSED:
                         self.__running_status = WorkflowStatus.PAUSED
                         self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, 'Workflow paused, waiting for confirmation.')
-                    time.sleep(0.5) # Prevent busy-waiting
+                    # approving or disapproving the nodes wakes the loop
+                    woken = self.__wait_wake(self.__poll_interval_max)
                     continue
 
                 if self.get_some_failed_task():
                     # There are failed tasks, set status and wait for user to retry
                     self.__running_status = WorkflowStatus.FAILED
                     self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, 'Workflow failed, waiting for retry.')
-                    self.__resume_event.clear()
-                    self.__resume_event.wait(timeout=1)
+                    # restarting or skipping the failed nodes wakes the loop
+                    woken = self.__wait_wake(self.__poll_interval_max)
+                    continue
                 else:
                     # No running nodes and no failed nodes, we are done
                     self.__running_status = WorkflowStatus.ENDED
                     self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, end_node)
                     break
 
-            time.sleep(0.2)
+            woken = self.__wait_wake(poll_interval)
 
         if self.__stopping and self.__running_status != WorkflowStatus.ENDED:
             self.__running_status = WorkflowStatus.FAILED
             self.notify_event(WorkflowEventType.WORKFLOW_EVENT, self.__running_status, "Workflow stopped")
+        self.__shutdown_launcher()
+        # let the listeners receive the last events before returning
+        self.__flush_events()
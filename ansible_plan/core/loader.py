@@ -2,9 +2,7 @@ import os
 import logging
 import logging.handlers
 import abc
-import inspect
-import random
-import string
+import itertools
 import typing
 import jinja2
 import copy
@@ -22,6 +20,10 @@ from .validation import validate_workflow
 from collections.abc import Mapping
 from enum import Enum
 
+# libyaml based loader when available, it is much faster than the pure python one
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
 class WorkflowLoader(metaclass=abc.ABCMeta):
     '''
     An abstract class that need to be implemented in order to support the
@@ -64,6 +66,10 @@ class WorkflowYamlLoader(WorkflowLoader):
         self._default_format_version: int = 1
         self.__check_mode: bool = check_mode
         self.__verbosity = verbosity
+        # sequence of the identifiers given to the nodes without one
+        self.__node_ids = itertools.count(1)
+        # links found while parsing, added to the workflow together
+        self.__pending_links: typing.List[typing.Tuple[str, str]] = []
         self.input_templating: dict = input_templating
 
         # initialize template environment
@@ -88,20 +94,27 @@ class WorkflowYamlLoader(WorkflowLoader):
         '''
         logger_name = self.__class__.__name__
         logger_file_path = os.path.join(logging_dir, 'loader.log')
-        if not os.path.exists(os.path.dirname(logger_file_path)):
-            os.makedirs(os.path.dirname(logger_file_path))
+        os.makedirs(os.path.dirname(logger_file_path), exist_ok=True)
 
         logger = logging.getLogger(logger_name)
         if logging_level:
             logger.setLevel(getattr(logging, logging_level.upper()))
-        logger_handler = logging.handlers.TimedRotatingFileHandler(
-            logger_file_path,
-            when='d',
-            backupCount=3,
-            encoding='utf8'
-        )
-        logger_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
-        logger.addHandler(logger_handler)
+        # the logger is shared by the loaders created in the same process: keep the handler
+        # if it already writes to the same file, otherwise replace the handler of the previous
+        # loader, so that each line is written once
+        if not any(getattr(handler, 'baseFilename', None) == os.path.abspath(logger_file_path)
+                   for handler in logger.handlers):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            logger_handler = logging.handlers.TimedRotatingFileHandler(
+                logger_file_path,
+                when='d',
+                backupCount=3,
+                encoding='utf8'
+            )
+            logger_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+            logger.addHandler(logger_handler)
         self._logger = logger
         self._logging_dir = logging_dir
 
@@ -114,7 +127,7 @@ class WorkflowYamlLoader(WorkflowLoader):
             dict: If the contents are YAML serialized
             None: if the contents are not YAML serialized
         '''
-        return yaml.safe_load(contents)
+        return yaml.load(contents, Loader=_YamlLoader)
 
     def _write_yaml(self, contents: dict, path: str):
         '''
@@ -289,6 +302,7 @@ class WorkflowYamlLoader(WorkflowLoader):
 
         # call the parser of the workflow key, starting with a serial strategy
         self._parse_workflow_v1(to_be_imported=self.__yaml_parsed['workflow'], parent_nodes=[], strategy='serial', defaults=defaults, options=options)
+        self._flush_links()
 
     def _perform_string_template_rendering(self, template_string: str, template_variables: typing.Dict[str, typing.Any]):
         try:
@@ -309,7 +323,7 @@ class WorkflowYamlLoader(WorkflowLoader):
             for key, value in parsed_yml.items():
                 if isinstance(value, str):
                     parsed_yml[key] = self._perform_string_template_rendering(value, template_variables)
-                    self._logger.debug("Templating: %s vars: %s" % (parsed_yml[key], template_variables))
+                    self._logger.debug("Templating: %s vars: %s", parsed_yml[key], template_variables)
                 elif isinstance(value, dict) or isinstance(value, list):
                     self._perform_template_rendering(value, template_variables)
         elif isinstance(parsed_yml, list):
@@ -317,7 +331,7 @@ class WorkflowYamlLoader(WorkflowLoader):
             for value in parsed_yml:
                 if isinstance(value, str):
                     parsed_yml[i] =  self._perform_string_template_rendering(value, template_variables)
-                    self._logger.debug("Templating: %s" % parsed_yml[i])
+                    self._logger.debug("Templating: %s", parsed_yml[i])
                 elif isinstance(value, dict) or isinstance(value, list):
                     self._perform_template_rendering(value, template_variables)
                 i = i + 1
@@ -368,7 +382,7 @@ class WorkflowYamlLoader(WorkflowLoader):
                     self._logger.info("Overwrited imported block templating (%s) with the importing node templating (%s)" % (inode['templating'], inode_templating))
                     inode["templating"] = inode_templating
                     current_template_variables.update(inode['templating'])
-                    self._logger.debug("Resulting template variables: %s" % current_template_variables)
+                    self._logger.debug("Resulting template variables: %s", current_template_variables)
 
                 if 'block' not in inode:
                     self._logger.error("The imported block file %s doesn't contain a block" % to_be_included_file)
@@ -393,6 +407,12 @@ class WorkflowYamlLoader(WorkflowLoader):
                 # perform the render on the lead of a tree
                 self._perform_template_rendering(inode, template_variables=current_template_variables)
 
+    def _flush_links(self):
+        ''' Add the pending links to the workflow with a single call'''
+        if self.__pending_links:
+            self.__workflow.add_links(self.__pending_links)
+            self.__pending_links = []
+
     def _parse_workflow_v1(self, to_be_imported: typing.List[dict], parent_nodes: typing.List[Node],
                            strategy: str, defaults: typing.Dict[str, str],
                            options: typing.Dict[str, str], level: int = 1, block_id: str = '_root'):
@@ -409,32 +429,37 @@ class WorkflowYamlLoader(WorkflowLoader):
         Raises:
             AnsibleWorkflowVaultScriptNotSet: If a node specify some vault ids but the vault script is not set
         '''
-        indentation = '\t' * (len(inspect.stack(0)) - 7)
+        indentation = '\t' * (level - 1)
+        debug = self._logger.isEnabledFor(logging.DEBUG)
 
         # init to loop over the structure
         zero_outdegree_nodes = []
         for inode in to_be_imported:
             # generate a node identifier and set to the node
-            gnode_id = inode.get('id', ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(5)))
-            gnode_id = str(gnode_id)
+            gnode_id = inode.get('id')
+            gnode_id = str(gnode_id) if gnode_id is not None else "n%05d" % next(self.__node_ids)
             inode['id'] = gnode_id
 
-            self._logger.debug("-->> %s node: %s       parents: %s       zero_outdegree: %s" %
-                               (indentation, inode['id'], [p.get_id() for p in parent_nodes], [p.get_id() for p in zero_outdegree_nodes]))
+            if debug:
+                self._logger.debug("-->> %s node: %s       parents: %s       zero_outdegree: %s",
+                                   indentation, inode['id'], [p.get_id() for p in parent_nodes], [p.get_id() for p in zero_outdegree_nodes])
 
             for parent_node in parent_nodes:
-                self._logger.debug("---- %s added graph link (%s) --> (%s)" % (indentation, parent_node.get_id(), gnode_id))
-                self.__workflow.add_link(parent_node.get_id(), gnode_id)
+                if debug:
+                    self._logger.debug("---- %s added graph link (%s) --> (%s)", indentation, parent_node.get_id(), gnode_id)
+                self.__pending_links.append((parent_node.get_id(), gnode_id))
 
             if strategy == 'serial':
                 parent_nodes = []
                 for zero_outdegree_node in zero_outdegree_nodes:
-                    self.__workflow.add_link(zero_outdegree_node.get_id(), gnode_id)
+                    self.__pending_links.append((zero_outdegree_node.get_id(), gnode_id))
                 zero_outdegree_nodes = []
 
             # generate the object representing the graph
             if 'block' in inode:
                 gnode = BNode(gnode_id, description=inode.get('description', ''), reference=inode.get('reference', ''))
+                # the links to the block are added before its nodes, keeping the nodes order in the graph
+                self._flush_links()
                 block_sub_nodes = self._parse_workflow_v1(inode['block'], [gnode, ], inode.get('strategy', 'parallel'), defaults, options, level + 1, gnode_id)
             else:
                 if 'import_playbook' in inode:
@@ -476,8 +501,9 @@ class WorkflowYamlLoader(WorkflowLoader):
 
                     gnode = PNode(**pnode_parameters)
                     gnode.set_logger(self._logger)
-                    self._logger.debug("---- %s added node: %s, level: %s, block type: %s, block id: %s" %
-                                    (indentation, pnode_parameters, level, strategy, block_id))
+                    if debug:
+                        self._logger.debug("---- %s added node: %s, level: %s, block type: %s, block id: %s",
+                                           indentation, pnode_parameters, level, strategy, block_id)
                 elif inode.get('checkpoint', False):
                     gnode = CNode(gnode_id, description=inode.get('description', ''), reference=inode.get('reference', ''))
                 else: # It's a info node
@@ -508,6 +534,7 @@ class WorkflowYamlLoader(WorkflowLoader):
                 else:
                     # or add current node as the parent
                     parent_nodes = [gnode, ]
-            self._logger.debug("<<-- %s node: %s       parents: %s       zero_outdegree: %s" %
-                               (indentation, gnode_id, [p.get_id() for p in parent_nodes], [p.get_id() for p in zero_outdegree_nodes]))
+            if debug:
+                self._logger.debug("<<-- %s node: %s       parents: %s       zero_outdegree: %s",
+                                   indentation, gnode_id, [p.get_id() for p in parent_nodes], [p.get_id() for p in zero_outdegree_nodes])
         return zero_outdegree_nodes
@@ -1,5 +1,7 @@
 from enum import Enum
+import sys
 import typing
+import threading
 from datetime import datetime
 import abc
 import os
@@ -32,7 +34,8 @@ class NodeStatus(Enum):
 
 class Node():
     ''' An abstract Node class of the graph'''
-    __metaclass__ = abc.ABCMeta
+    # a workflow can have thousands of nodes, do not give each of them an attribute dict
+    __slots__ = ('__id', '_logger', '_started_time', '_ended_time', '_telemetry', '__skipped', '_status', '__description', '__reference')
 
     def __init__(self, id: str, description='', reference=''):
         '''
@@ -42,10 +45,13 @@ class Node():
         Raises:
             AnsibleWorkflowVaultScriptNotSet: If a node specify some vault ids but the vault script is not set
         '''
-        self.__id = id
+        # the id is the key of all the workflow lookups, share a single string object
+        self.__id = sys.intern(id)
         self._logger: logging.Logger = logging
         self._started_time: datetime = None
         self._ended_time: datetime = None
+        # started and ended times formatted for the nodes listing
+        self._telemetry: typing.Optional[dict] = None
         self.__skipped = False
         self._status: typing.Optional[NodeStatus] = None
         self.__description = description
@@ -91,16 +97,25 @@ class Node():
 
     def set_ended_time(self, time):
         self._ended_time = time
+        self._telemetry = None
 
     def set_started_time(self, time):
         self._started_time = time
+        self._telemetry = None
 
     def get_telemetry(self):
-        return dict(started=self._started_time.strftime("%H:%M:%S") if self._started_time else '',
-                    ended=self._ended_time.strftime("%H:%M:%S") if self._ended_time else '')
+        # the times are formatted once per change, the nodes are listed far more often
+        telemetry = self._telemetry
+        if telemetry is None:
+            telemetry = self._telemetry = dict(
+                started=self._started_time.strftime("%H:%M:%S") if self._started_time else '',
+                ended=self._ended_time.strftime("%H:%M:%S") if self._ended_time else '')
+        return telemetry
 
 
 class BNode(Node):
+    __slots__ = ()
+
     def __init__(self, id, description='', reference=''):
         super(BNode, self).__init__(id, description, reference)
 
@@ -113,7 +128,16 @@ class BNode(Node):
         return 'block'
 
 
+def _discard_runner_event(event: dict) -> bool:
+    ''' Ansible runner event handler telling to not write the event in the artifacts'''
+    return False
+
+
 class PNode(Node):
+    __slots__ = ('__playbook', '__inventory', '__extravars', '__artifact_dir', '__limit', '__vault_ids', '__project_path',
+                 '__thread', '__runner', '__check_mode', '__diff_mode', '__cmdline', '__verbosity', '__hard_stop',
+                 '__finished', '__finished_callback', '__final_status', '__stdout_path', 'ident')
+
     def __init__(self, id, playbook, inventory, artifact_dir, limit=None, project_path=None, extra_vars={}, vault_ids=[], check_mode=False, diff_mode=True, verbosity=1, description='', reference=''):
         super(PNode, self).__init__(id, description, reference)
         self.__playbook = playbook
@@ -127,8 +151,32 @@ class PNode(Node):
         self.__runner = None
         self.__check_mode = check_mode
         self.__diff_mode = diff_mode
+        # the ansible-playbook options do not change between runs
+        self.__cmdline = ' '.join(["--vault-id %s" % vid for vid in vault_ids])
+        if check_mode:
+            self.__cmdline += ' --check'
+        if diff_mode:
+            self.__cmdline += ' --diff'
         self.__verbosity = verbosity
         self.__hard_stop = False
+        # set by ansible runner once the playbook run is over
+        self.__finished = threading.Event()
+        self.__finished_callback = None
+        # status of the last playbook run, once it is over
+        self.__final_status = None
+        # stdout written by ansible runner for the last run
+        self.__stdout_path = os.path.join(artifact_dir, id, 'stdout')
+
+    def set_finished_callback(self, callback: typing.Callable[['PNode'], None]):
+        ''' Set a function called with the node as soon as its playbook run is over'''
+        self.__finished_callback = callback
+
+    def _on_runner_finished(self, runner):
+        # the runner is the one of the callback, run_async could have not returned it yet
+        self.__final_status = self.__get_runner_final_status(runner)
+        self.__finished.set()
+        if self.__finished_callback is not None:
+            self.__finished_callback(self)
 
     def check_node_input(self):
         # convert project path in absolute path
@@ -156,6 +204,8 @@ class PNode(Node):
             raise AnsibleWorkflowPlaybookNodeCheck(
                 "Node %s playbook doesn't exists: %s" % (self.get_id(), self.__playbook)
             )
+        # the paths are resolved once here, run() uses them as they are
+        self.__playbook = os.path.abspath(self.__playbook)
 
     def get_verbosity(self):
         return self.__verbosity
@@ -168,18 +218,24 @@ class PNode(Node):
             return self._status
         if self.is_skipped():
             return NodeStatus.SKIPPED
+        elif self.__final_status is not None:
+            return self.__final_status
         elif self.__thread is None:
             return NodeStatus.NOT_STARTED
+        # the runner thread could die without calling the finished callback
+        elif not self.__finished.is_set() and self.__thread.is_alive():
+            return NodeStatus.RUNNING
         else:
-            # print("Node %s status is %s - error is %s" % (self.get_id(), self.__runner.errored, self.__runner.status ))
-            if self.__thread.is_alive():
-                return NodeStatus.RUNNING
-            elif self.is_canceled():
-                return NodeStatus.STOPPED
-            elif self.is_failed():
-                return NodeStatus.FAILED
-            else:
-                return NodeStatus.ENDED
+            self.__final_status = self.__get_runner_final_status(self.__runner)
+            return self.__final_status
+
+    @staticmethod
+    def __get_runner_final_status(runner):
+        if runner.status == 'canceled':
+            return NodeStatus.STOPPED
+        elif runner.status == 'failed':
+            return NodeStatus.FAILED
+        return NodeStatus.ENDED
 
     def get_type(self):
         return 'playbook'
@@ -199,6 +255,9 @@ class PNode(Node):
     def get_extravars(self):
         return self.__extravars
 
+    def get_stdout_path(self):
+        return self.__stdout_path
+
     def stop(self):
         self._logger.info("Stopping node %s" % self.get_id())
         self.__hard_stop = True
@@ -209,13 +268,15 @@ class PNode(Node):
     def reset_status(self):
         self.__thread = None
         self.__runner = None
-        self._started_time = None
-        self._ended_time = None
+        self.__final_status = None
+        self.__finished.clear()
+        self.set_started_time(None)
+        self.set_ended_time(None)
 
     def run(self):
         self.set_started_time(datetime.now())
-        self.__inventory = os.path.abspath(self.__inventory)
-        self.__playbook = os.path.abspath(self.__playbook)
+        self.__final_status = None
+        self.__finished.clear()
 
         # put the current directory to the parent of the playbook
         env_vars = {}
@@ -223,27 +284,27 @@ class PNode(Node):
         if self.__project_path:
             env_vars = {'ANSIBLE_COLLECTIONS_PATHS': os.path.join(self.__project_path, 'collections')}
 
-        playbook_cmd_line = ' '.join(["--vault-id %s" % vid for vid in self.__vault_ids])
-        if self.__check_mode:
-            playbook_cmd_line += ' --check'
-        if self.__diff_mode:
-            playbook_cmd_line += ' --diff'
-
-        # modify identification in case of multiple start
+        # modify identification in case of multiple start, reading the artifacts once
         ident = self.get_id()
-        if os.path.exists(os.path.join(self.__artifact_dir, "%s" % self.get_id())):
-            i=1
-            ident = "%s_%s" % (self.get_id(), i)
-            while os.path.exists(os.path.join(self.__artifact_dir, "%s_%s" % (self.get_id(), i))):
+        try:
+            with os.scandir(self.__artifact_dir) as entries:
+                existing_idents = {entry.name for entry in entries}
+        except FileNotFoundError:
+            existing_idents = set()
+        if ident in existing_idents:
+            i = 1
+            while "%s_%s" % (self.get_id(), i) in existing_idents:
                 i = i + 1
-                ident = "%s_%s" % (self.get_id(), i)
+            ident = "%s_%s" % (self.get_id(), i)
         self.ident = ident
+        self.__stdout_path = os.path.join(self.__artifact_dir, ident, 'stdout')
         self.__thread, self.__runner = ansible_runner.run_async(playbook=self.__playbook,
                                                                 inventory=self.__inventory,
                                                                 ident=ident,
                                                                 limit=self.__limit,
                                                                 project_dir=self.__project_path,
-                                                                event_handler=lambda x: False,
+                                                                # the job events are neither stored nor used
+                                                                event_handler=_discard_runner_event,
                                                                 omit_event_data=True,
                                                                 envvars=env_vars,
                                                                 verbosity=self.get_verbosity(),
@@ -252,13 +313,16 @@ class PNode(Node):
                                                                     'suppress_ansible_output': True
                                                                 },
                                                                 cancel_callback=self._cancel_callback,
+                                                                finished_callback=self._on_runner_finished,
                                                                 # vault_ids=self.__vault_ids,
-                                                                cmdline=playbook_cmd_line,
+                                                                cmdline=self.__cmdline,
                                                                 extravars=self.__extravars,
                                                                 quiet=True)
 
 
 class INode(Node):
+    __slots__ = ()
+
     def __init__(self, id, description='', reference=''):
         super(INode, self).__init__(id, description, reference)
 
@@ -272,6 +336,8 @@ class INode(Node):
 
 
 class CNode(Node):
+    __slots__ = ()
+
     def __init__(self, id, description='', reference=''):
         super(CNode, self).__init__(id, description, reference)
 
@@ -313,3 +379,8 @@ class WorkflowListener(object):
     def notify_event(self, event: WorkflowEvent):
         ''' A notification method to be overwrited'''
         pass
+
+    def notify_events(self, events: typing.List[WorkflowEvent]):
+        ''' Notify the events queued together, one by one unless overwrited'''
+        for event in events:
+            self.notify_event(event)
@@ -1,8 +1,20 @@
+import functools
 import jsonschema
 import json
 from .exceptions import AnsibleWorkflowValidationError
 
-def validate_workflow(instance, schema_path):
+
+@functools.lru_cache(maxsize=None)
+def _get_validator(schema_path):
+    # the schema is read and checked once, the workflow is validated against it more times
     with open(schema_path, 'r') as f:
         schema = json.load(f)
-    jsonschema.validate(instance=instance, schema=schema)
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def validate_workflow(instance, schema_path):
+    error = jsonschema.exceptions.best_match(_get_validator(schema_path).iter_errors(instance))
+    if error is not None:
+        raise error
@@ -1,4 +1,5 @@
 import argparse
+import hashlib
 import logging
 import os
 import json
@@ -7,7 +8,10 @@ import sys
 import threading
 import time
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, List
 
@@ -17,7 +21,7 @@ class StopWorkflowRequest(BaseModel):
 
 from .core.loader import WorkflowYamlLoader
 from .core.engine import AnsibleWorkflow
-from .core.models import NodeStatus, WorkflowStatus, PNode, INode, CNode
+from .core.models import NodeStatus, WorkflowStatus, PNode, INode, CNode, WorkflowEvent, WorkflowListener
 from .core.exceptions import (
     AnsibleWorkflowLoadingError,
     AnsibleWorkflowValidationError,
@@ -32,6 +36,33 @@ app = FastAPI()
 # Global state
 workflow_lock = threading.Lock()
 current_workflow: Optional[AnsibleWorkflow] = None
+# notified with each workflow event, counted so a stream knows if it missed one while sending
+nodes_changed = threading.Condition()
+nodes_changes_count = 0
+# seconds a nodes events stream waits for the changes at once, and without sending anything
+_NODES_EVENTS_WAIT = 1
+_NODES_EVENTS_HEARTBEAT = 15
+
+
+class NodesChangedListener(WorkflowListener):
+    ''' Wake up the nodes event streams when the workflow notifies an event'''
+    def notify_event(self, event: WorkflowEvent):
+        self.notify_events([event])
+
+    def notify_events(self, events: List[WorkflowEvent]):
+        global nodes_changes_count
+        with nodes_changed:
+            nodes_changes_count += len(events)
+            nodes_changed.notify_all()
+
+
+def _set_current_workflow(workflow: AnsibleWorkflow):
+    ''' Set the current workflow, waking up the requests waiting for its nodes'''
+    global current_workflow
+    with nodes_changed:
+        current_workflow = workflow
+        nodes_changed.notify_all()
+
 
 class WorkflowStartRequest(BaseModel):
     workflow_file: str
@@ -47,11 +78,12 @@ class WorkflowStartRequest(BaseModel):
     log_level: str = "info"
     verify_only: bool = False
     doubtful_mode: bool = False
+    max_parallel_playbooks: int = 0
+    draw_graph: bool = False
 
 
 @app.post("/workflow")
 async def start_workflow(request: WorkflowStartRequest, background_tasks: BackgroundTasks):
-    global current_workflow
     with workflow_lock:
         if current_workflow and current_workflow.get_running_status() in [WorkflowStatus.RUNNING,
                                                                            WorkflowStatus.PAUSED,
@@ -76,7 +108,8 @@ async def start_workflow(request: WorkflowStartRequest, background_tasks: Backgr
                 request.doubtful_mode,
             )
             aw = loader.parse(request.extra_vars)
-            current_workflow = aw
+            aw.add_event_listener(NodesChangedListener())
+            _set_current_workflow(aw)
         except (
             AnsibleWorkflowLoadingError,
             jinja2.exceptions.UndefinedError,
@@ -91,7 +124,7 @@ async def start_workflow(request: WorkflowStartRequest, background_tasks: Backgr
             )
             aw.add_validation_error(str(e))
             aw.set_status(WorkflowStatus.FAILED)
-            current_workflow = aw
+            _set_current_workflow(aw)
             # Use a 422 status code for validation errors, as this is more specific than a generic 500.
             raise HTTPException(status_code=422, detail={"validation_errors": [str(e)]})
 
@@ -99,6 +132,10 @@ async def start_workflow(request: WorkflowStartRequest, background_tasks: Backgr
             aw.set_filtered_nodes(request.filter_nodes)
         if request.skip_nodes:
             aw.set_skipped_nodes(request.skip_nodes)
+        if request.max_parallel_playbooks:
+            aw.set_max_running_playbooks(request.max_parallel_playbooks)
+        if request.draw_graph:
+            aw.set_draw_graph(True)
 
         start_node = request.start_from_node if request.start_from_node else '_s'
         end_node = request.end_to_node if request.end_to_node else '_e'
@@ -109,7 +146,11 @@ async def start_workflow(request: WorkflowStartRequest, background_tasks: Backgr
 
 
 @app.get("/workflow")
-def get_workflow_status():
+def get_workflow_status(request: Request):
+    return etag_response(request, _get_workflow_status())
+
+
+def _get_workflow_status():
     with workflow_lock:
         if not current_workflow:
             return {"status": WorkflowStatus.NOT_STARTED}
@@ -123,71 +164,235 @@ def get_workflow_status():
         return response
 
 
+@app.get("/workflow/state")
+def get_workflow_state(request: Request):
+    '''
+    The workflow status and its nodes together, for the outputs refreshing both at each step
+    '''
+    return etag_response(request, {"status": _get_workflow_status(), "nodes": _get_workflow_nodes()})
+
+
+def etag_response(request: Request, content) -> Response:
+    '''
+    Build a JSON response tagged with an ETag of its content, answering
+    304 Not Modified when the client already has the same content
+    '''
+    body = json.dumps(jsonable_encoder(content), sort_keys=True).encode('utf-8')
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
 @app.get("/workflow/nodes")
-def get_workflow_nodes():
+def get_workflow_nodes(request: Request, wait: float = 0):
+    '''
+    Return the workflow nodes. With a wait, when no workflow has been started
+    yet, block up to the given seconds until one is started
+    '''
+    nodes = _get_workflow_nodes()
+    if not nodes and wait > 0:
+        with nodes_changed:
+            nodes_changed.wait_for(lambda: current_workflow is not None, timeout=min(wait, 30))
+        nodes = _get_workflow_nodes()
+    return etag_response(request, nodes)
+
+
+def _wait_nodes_changes(changes_count, watched_workflow, timeout):
+    '''
+    Wait up to the given seconds for a workflow event or a new workflow
+    Returns:
+        The changes count and the current workflow
+    '''
+    with nodes_changed:
+        nodes_changed.wait_for(lambda: nodes_changes_count != changes_count or current_workflow is not watched_workflow,
+                               timeout=timeout)
+        return nodes_changes_count, current_workflow
+
+
+def _get_workflow_nodes_body():
+    return json.dumps(jsonable_encoder(_get_workflow_nodes()), sort_keys=True)
+
+
+@app.get("/workflow/nodes/events")
+async def stream_workflow_nodes(request: Request):
+    '''
+    Server-sent events stream sending the whole nodes list each time a node
+    changes, with a comment line as heartbeat on a quiet workflow
+    '''
+    async def events():
+        changes_count = None
+        watched_workflow = None
+        last_sent = time.monotonic()
+        # the changes are waited in a worker thread for a short time, so the thread is
+        # given back soon and a disconnected client is noticed between the waits
+        while not await request.is_disconnected():
+            last_changes = (changes_count, watched_workflow)
+            changes_count, watched_workflow = await run_in_threadpool(
+                _wait_nodes_changes, changes_count, watched_workflow, _NODES_EVENTS_WAIT)
+            # the nodes are built only when the workflow notified a change or a new workflow is started
+            if (changes_count, watched_workflow) != last_changes:
+                yield "data: %s\n\n" % await run_in_threadpool(_get_workflow_nodes_body)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= _NODES_EVENTS_HEARTBEAT:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# (workflow, {node id: node object, node fields not changing during the run}) of the last nodes listing
+_static_nodes_cache = (None, {})
+
+
+def _get_static_nodes_info(workflow: AnsibleWorkflow):
+    '''
+    Return the node objects and their fields that do not change while the workflow runs, built once per workflow
+    '''
+    global _static_nodes_cache
+    cached_workflow, static_nodes = _static_nodes_cache
+    if cached_workflow is workflow and len(static_nodes) == len(workflow.get_nodes()):
+        return static_nodes
+
+    static_nodes = {}
+    all_node_datas = workflow.get_node_datas()
+    for node_id in workflow.get_nodes():
+        node_obj = workflow.get_node_object(node_id)
+        node_info = {
+            "id": node_obj.get_id(),
+            "type": node_obj.get_type(),
+        }
+
+        if node_info['type'] == 'block':
+            node_data = all_node_datas.get(node_id, {})
+            if 'child' in node_data and 'strategy' in node_data['child']:
+                node_info['strategy'] = node_data['child']['strategy']
+
+        if isinstance(node_obj, PNode):
+            node_info["extravars"] = node_obj.get_extravars()
+        if isinstance(node_obj, (PNode, INode, CNode)):
+            node_info.update({
+                "description": node_obj.get_description(),
+                "reference": node_obj.get_reference(),
+            })
+        static_nodes[node_id] = (node_obj, node_info)
+    _static_nodes_cache = (workflow, static_nodes)
+    return static_nodes
+
+
+def _get_workflow_nodes():
     with workflow_lock:
         if not current_workflow:
             return []
 
         nodes_data = []
-        all_node_datas = current_workflow.get_node_datas()
-        for node_id in current_workflow.get_nodes():
-            node_obj = current_workflow.get_node_object(node_id)
+        for node_obj, static_info in _get_static_nodes_info(current_workflow).values():
             status = node_obj.get_status()
-            node_info = {
-                "id": node_obj.get_id(),
-                "status": status.value if hasattr(status, 'value') else status,
-                "type": node_obj.get_type(),
-            }
-
-            if node_info['type'] == 'block':
-                node_data = all_node_datas.get(node_id, {})
-                if 'child' in node_data and 'strategy' in node_data['child']:
-                    node_info['strategy'] = node_data['child']['strategy']
+            node_info = dict(static_info)
+            node_info["status"] = status.value if hasattr(status, 'value') else status
 
             if isinstance(node_obj, PNode):
-                node_info.update({
-                    "playbook": node_obj.get_playbook(),
-                    "inventory": node_obj.get_inventory(),
-                    "extravars": node_obj.get_extravars(),
-                    "description": node_obj.get_description(),
-                    "reference": node_obj.get_reference(),
-                })
+                # the paths are made absolute when the workflow is validated
+                node_info["playbook"] = node_obj.get_playbook()
+                node_info["inventory"] = node_obj.get_inventory()
                 node_info.update(node_obj.get_telemetry())
-            elif isinstance(node_obj, (INode, CNode)):
-                node_info.update({
-                    "description": node_obj.get_description(),
-                    "reference": node_obj.get_reference(),
-                })
             nodes_data.append(node_info)
         return nodes_data
 
+
+# revision of the nodes, increased each time a node is found changed by a changes request
+_nodes_revision = 0
+# (workflow, revision before its first node, {node id: (revision, node info)}) of the last changes request
+_nodes_revisions_cache = (None, 0, {})
+_nodes_revisions_lock = threading.Lock()
+
+
+@app.get("/workflow/nodes/changes")
+def get_workflow_nodes_changes(since: int = 0):
+    '''
+    Return the current nodes revision with the nodes changed after the given
+    revision. All the nodes are returned, with the reset flag telling to drop
+    the known ones, for a revision of another workflow or unknown to the backend
+    '''
+    global _nodes_revision, _nodes_revisions_cache
+    workflow = current_workflow
+    nodes = _get_workflow_nodes()
+    with _nodes_revisions_lock:
+        cached_workflow, first_revision, revisions = _nodes_revisions_cache
+        if cached_workflow is not workflow:
+            first_revision, revisions = _nodes_revision, {}
+        for node_info in nodes:
+            last = revisions.get(node_info['id'])
+            if last is None or last[1] != node_info:
+                _nodes_revision += 1
+                revisions[node_info['id']] = (_nodes_revision, node_info)
+        _nodes_revisions_cache = (workflow, first_revision, revisions)
+        reset = not first_revision < since <= _nodes_revision
+        if reset:
+            since = 0
+        changed = [node_info for revision, node_info in revisions.values() if revision > since]
+        return {"revision": _nodes_revision, "reset": reset, "nodes": changed}
+
+
 @app.get("/workflow/graph")
-def get_workflow_graph():
+def get_workflow_graph(request: Request):
     with workflow_lock:
         if not current_workflow:
             raise HTTPException(status_code=404, detail="Workflow not found.")
-        return {"edges": current_workflow.get_original_graph_edges()}
+        return etag_response(request, {"edges": current_workflow.get_original_graph_edges()})
 
 @app.get("/workflow/node/{node_id}/stdout")
-def get_node_stdout(node_id: str):
+def get_node_stdout(node_id: str, request: Request):
+    '''
+    Return the whole stdout of a playbook node as JSON or, when a
+    "Range: bytes=<offset>-" header is given, only the raw bytes after the offset
+    '''
     with workflow_lock:
         if not current_workflow:
             raise HTTPException(status_code=404, detail="Workflow not found.")
 
-        logging_dir = current_workflow.get_logging_dir()
         node_obj = current_workflow.get_node_object(node_id)
         if not isinstance(node_obj, PNode):
             raise HTTPException(status_code=404, detail="Node is not a playbook node.")
+        stdout_path = node_obj.get_stdout_path()
 
-        ident = getattr(node_obj, 'ident', node_id)
-        stdout_path = os.path.join(logging_dir, ident, "stdout")
-
-        if not os.path.exists(stdout_path):
-            return {"stdout": ""}
+    range_header = request.headers.get("range")
+    if range_header:
+        return _get_stdout_range(stdout_path, range_header)
 
+    try:
         with open(stdout_path, "r") as f:
             return {"stdout": f.read()}
+    except FileNotFoundError:
+        return {"stdout": ""}
+
+
+def _get_stdout_range(stdout_path: str, range_header: str) -> Response:
+    unit, _, byte_range = range_header.partition("=")
+    start, _, _ = byte_range.partition("-")
+    if unit.strip() != "bytes" or not start.strip().isdigit():
+        raise HTTPException(status_code=400, detail="Only 'bytes=<offset>-' ranges are supported.")
+    start = int(start)
+
+    # the file is opened only when there is something new to read
+    try:
+        size = os.stat(stdout_path).st_size
+    except FileNotFoundError:
+        size = 0
+    if start >= size:
+        return Response(status_code=416, headers={"Content-Range": "bytes */%d" % size})
+
+    fd = os.open(stdout_path, os.O_RDONLY)
+    try:
+        content = os.pread(fd, size - start, start)
+    finally:
+        os.close(fd)
+    return Response(
+        content=content,
+        status_code=206,
+        media_type="application/octet-stream",
+        headers={"Content-Range": "bytes %d-%d/%d" % (start, start + len(content) - 1, size)},
+    )
 
 
 @app.post("/workflow/stop")
@@ -282,8 +487,7 @@ def health_check():
 def define_logger(logging_dir, level):
     common_format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
     logger_file_path = os.path.join(logging_dir, 'service.log')
-    if not os.path.exists(os.path.dirname(logger_file_path)):
-        os.makedirs(os.path.dirname(logger_file_path))
+    os.makedirs(os.path.dirname(logger_file_path), exist_ok=True)
 
     logger = logging.getLogger('main')
     if level:
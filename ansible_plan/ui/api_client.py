@@ -1,42 +1,158 @@
 import httpx
+import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+try:
+    import orjson
+    _decode = orjson.loads
+except ImportError:
+    _decode = json.loads
+
+
+def _loads(response: httpx.Response):
+    return _decode(response.content)
+
 
 class ApiClient:
     def __init__(self, base_url: str, logger=None):
         self.base_url = base_url
-        self.client = httpx.Client(base_url=self.base_url)
+        # a single client shared by all the UI workers, keeping a small pool of
+        # keep-alive connections towards the backend: the events stream holds one
+        # of them for its whole life, so leave room for the concurrent requests.
+        # The idle connections are kept longer than the slowest UI poll interval.
+        # The limits are given to the transport, httpx ignores the client ones with a custom transport
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            transport=httpx.HTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=30),
+            ),
+        )
         self.logger = logger or logging.getLogger(__name__)
+        # last (etag, content) received for each path, returned when the backend answers 304 Not Modified
+        self._etag_cache: Dict[str, Tuple[str, Any]] = {}
+        # nodes received through the changes endpoint, with the revision they are updated to
+        self._nodes_revision = 0
+        self._nodes_by_id: Dict[str, Dict[str, Any]] = {}
+        self._nodes_list: Optional[List[Dict[str, Any]]] = None
+        self._graph_edges: Optional[List[List[str]]] = None
+        # the nodes events stream failure is logged once until the stream is opened again
+        self._events_stream_failed = False
+
+    def _get_cached(self, path: str) -> Any:
+        '''
+        GET a JSON resource sending the ETag of the last content received,
+        which is returned without decoding when it has not changed
+        '''
+        etag, content = self._etag_cache.get(path, (None, None))
+        headers = {"If-None-Match": etag} if etag else None
+        response = self.client.get(path, headers=headers)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return content
+        response.raise_for_status()
+        content = _loads(response)
+        if response.headers.get("ETag"):
+            self._etag_cache[path] = (response.headers["ETag"], content)
+        return content
 
     def get_workflow_status(self) -> Optional[Dict[str, Any]]:
         try:
-            response = self.client.get("/workflow")
-            response.raise_for_status()
-            return response.json()
+            return self._get_cached("/workflow")
+        except (httpx.ConnectError, httpx.HTTPStatusError):
+            return None
+
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        '''
+        Return the workflow status data and the nodes list with a single request,
+        as a dict with the "status" and "nodes" keys
+        '''
+        try:
+            return self._get_cached("/workflow/state")
         except (httpx.ConnectError, httpx.HTTPStatusError):
             return None
 
     def get_all_nodes(self) -> Optional[List[Dict[str, Any]]]:
         try:
-            response = self.client.get("/workflow/nodes")
-            response.raise_for_status()
-            return response.json()
+            return self._get_cached("/workflow/nodes")
         except (httpx.ConnectError, httpx.HTTPStatusError):
             return None
 
-    def get_workflow_graph(self) -> Optional[List[List[str]]]:
+    def get_nodes_changes(self) -> Optional[List[Dict[str, Any]]]:
+        '''
+        Return the whole nodes list, fetching only the nodes changed since the
+        last call. The same list is returned while no node changes
+        '''
         try:
-            response = self.client.get("/workflow/graph")
+            response = self.client.get("/workflow/nodes/changes", params={"since": self._nodes_revision})
             response.raise_for_status()
-            return response.json()["edges"]
+            changes = _loads(response)
         except (httpx.ConnectError, httpx.HTTPStatusError):
             return None
+        if changes["reset"]:
+            # the workflow has been replaced or the backend restarted, all its nodes have been sent
+            self._nodes_by_id.clear()
+        if changes["reset"] or changes["nodes"] or self._nodes_list is None:
+            for node in changes["nodes"]:
+                self._nodes_by_id[node['id']] = node
+            self._nodes_list = list(self._nodes_by_id.values())
+        self._nodes_revision = changes["revision"]
+        return self._nodes_list
+
+    def wait_for_nodes(self, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        '''
+        Return the nodes as soon as the backend has them, the request being
+        held by the backend up to the given seconds while there are none
+        '''
+        try:
+            response = self.client.get("/workflow/nodes", params={"wait": timeout},
+                                       timeout=httpx.Timeout(5.0, read=timeout + 5.0))
+            response.raise_for_status()
+            return _loads(response)
+        except (httpx.TransportError, httpx.HTTPStatusError):
+            return None
 
-    def get_node_stdout(self, node_id: str) -> Optional[str]:
+    def stream_node_events(self, stop_event=None) -> Iterator[List[Dict[str, Any]]]:
+        '''
+        Yield the nodes list each time the backend notifies a change. The
+        generator ends when the stream is closed, cannot be opened or the
+        stop event is set.
+        '''
         try:
-            response = self.client.get(f"/workflow/node/{node_id}/stdout")
+            with self.client.stream("GET", "/workflow/nodes/events", timeout=httpx.Timeout(5.0, read=None)) as response:
+                response.raise_for_status()
+                if self._events_stream_failed:
+                    self._events_stream_failed = False
+                    self.logger.info("Nodes events stream opened again")
+                for line in response.iter_lines():
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    if line.startswith("data:"):
+                        yield _decode(line[len("data:"):])
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if not self._events_stream_failed:
+                self._events_stream_failed = True
+                self.logger.warning(f"Nodes events stream interrupted: {e}")
+
+    def get_workflow_graph(self) -> Optional[List[List[str]]]:
+        # the graph does not change while the workflow runs, it is requested only until received
+        if self._graph_edges is None:
+            try:
+                self._graph_edges = self._get_cached("/workflow/graph")["edges"]
+            except (httpx.ConnectError, httpx.HTTPStatusError):
+                return None
+        return self._graph_edges
+
+    def get_node_stdout_since(self, node_id: str, offset: int = 0) -> Optional[Tuple[bytes, int]]:
+        '''
+        Fetch only the stdout bytes written after the given offset, returning
+        them with the offset to be used for the next call
+        '''
+        try:
+            response = self.client.get(f"/workflow/node/{node_id}/stdout", headers={"Range": f"bytes={offset}-"})
+            if response.status_code == httpx.codes.REQUESTED_RANGE_NOT_SATISFIABLE:
+                return b"", offset
             response.raise_for_status()
-            return response.json()["stdout"]
+            return response.content, offset + len(response.content)
         except (httpx.ConnectError, httpx.HTTPStatusError):
             return None
 
@@ -100,6 +216,10 @@ class ApiClient:
         except (httpx.ConnectError, httpx.HTTPStatusError):
             pass
 
+    def close(self):
+        ''' Close the pooled connections towards the backend'''
+        self.client.close()
+
     def check_health(self) -> bool:
         try:
             response = self.client.get("/health")
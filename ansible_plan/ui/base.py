@@ -1,11 +1,18 @@
+import atexit
 import threading
 import os
+import queue
 import logging
 import logging.handlers
 import abc
 from .api_client import ApiClient
 from ..core.models import WorkflowStatus
 
+# workflow statuses checked at each step
+_ENDED = WorkflowStatus.ENDED.value
+_FAILED = WorkflowStatus.FAILED.value
+
+
 class WorkflowOutput(threading.Thread):
     '''
     A general workflow output class to be implemented by subclasses
@@ -14,7 +21,11 @@ class WorkflowOutput(threading.Thread):
         threading.Thread.__init__(self)
         self._define_logger(logging_dir, log_level)
         self.api_client = ApiClient(backend_url, logger=self._logger)
-        self._refresh_interval = 2
+        # the polling interval grows from the minimum up to the maximum while nothing changes
+        self._refresh_min = cmd_args.refresh_min
+        self._refresh_max = cmd_args.refresh_max
+        self._refresh_interval = self._refresh_min
+        self._idle_ticks = 0
         self.__verify_only = cmd_args.verify_only
         self.__interactive_retry = cmd_args.interactive_retry
         self.event: threading.Event = event
@@ -27,8 +38,7 @@ class WorkflowOutput(threading.Thread):
         # Use a fixed log name for now, as we don't have the workflow object here.
         self._log_name = "frontend.log"
         logger_file_path = os.path.join(logging_dir, self._log_name)
-        if not os.path.exists(os.path.dirname(logger_file_path)):
-            os.makedirs(os.path.dirname(logger_file_path))
+        os.makedirs(os.path.dirname(logger_file_path), exist_ok=True)
 
         logger = logging.getLogger(logger_name)
         if level:
@@ -40,7 +50,12 @@ class WorkflowOutput(threading.Thread):
             encoding='utf8'
         )
         logger_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
-        logger.addHandler(logger_handler)
+        # the file is written by the listener thread, the logging threads only enqueue the records
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, logger_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
         self._logger = logger
         self._logging_dir = logging_dir
 
@@ -49,19 +64,18 @@ class WorkflowOutput(threading.Thread):
         self.draw_init()
 
         status_data = None
+        status = None
         while not self.event.is_set():
-            status_data = self.api_client.get_workflow_status()
+            status_data = self.draw_step()
             status = status_data.get('status') if status_data else None
             self._logger.info(f"Checking status: {status}")
 
-            if status == WorkflowStatus.ENDED.value:
+            if status == _ENDED:
                 break
 
-            if status == WorkflowStatus.FAILED.value and not self.__interactive_retry:
+            if status == _FAILED and not self.__interactive_retry:
                 break
 
-            self.draw_step()
-
             if hasattr(self, 'user_chose_to_quit') and self.user_chose_to_quit:
                 break
 
@@ -82,8 +96,8 @@ class WorkflowOutput(threading.Thread):
         pass
 
     @abc.abstractmethod
-    def draw_step(self):
-        ''' Draw the workflow'''
+    def draw_step(self) -> dict:
+        ''' Draw the workflow and return the workflow status data'''
         pass
 
     @abc.abstractmethod
@@ -1,16 +1,50 @@
+import os
 import time
 import threading
-from datetime import datetime
+import queue
+import contextlib
+import operator
 from rich.console import Console
 import sys
-import select
+import selectors
 import tty
 import termios
 from rich.table import Table
 from rich.prompt import Prompt
 from rich.text import Text
 from .base import WorkflowOutput
-from ..core.models import NodeStatus
+from ..core.models import NodeStatus, WorkflowStatus
+
+_get_id_status = operator.itemgetter('id', 'status')
+
+# a single console shared by all the instances, output is already styled so highlighting is disabled
+_CONSOLE = Console(highlight=False)
+
+# prebuilt status texts, avoiding to parse the markup at each render
+_STATUS_TEXT = {
+    NodeStatus.RUNNING.value: Text('started', style='yellow'),
+    NodeStatus.ENDED.value: Text('completed', style='green'),
+    NodeStatus.FAILED.value: Text('failed', style='bright_red'),
+    NodeStatus.NOT_STARTED.value: Text('not started', style='white'),
+    NodeStatus.SKIPPED.value: Text('skipped', style='cyan'),
+    NodeStatus.STOPPED.value: Text('stopped', style='red'),
+    NodeStatus.AWAITING_CONFIRMATION.value: Text('awaiting confirmation', style='bold yellow'),
+}
+_UNKNOWN_STATUS_TEXT = Text('unknown')
+_ENDED = NodeStatus.ENDED.value
+# workflow statuses checked at each step
+_WORKFLOW_ENDED = WorkflowStatus.ENDED.value
+_WORKFLOW_FAILED = WorkflowStatus.FAILED.value
+
+# shown in the playbook column of the nodes without a playbook and without a description
+_DEFAULT_DESCRIPTIONS = {
+    'info': 'Info',
+    'checkpoint': 'Checkpoint',
+}
+
+# answers accepted by the interactive prompts
+_CONFIRM_CHOICES = frozenset('yn')
+_RETRY_CHOICES = frozenset('ynsl')
 
 
 class StdoutWorkflowOutput(WorkflowOutput):
@@ -18,28 +52,57 @@ class StdoutWorkflowOutput(WorkflowOutput):
 
     def __init__(self, backend_url, event, logging_dir, log_level, cmd_args):
         super().__init__(backend_url, event, logging_dir, log_level, cmd_args)
-        self._refresh_interval = 2
-        self.__console = Console()
+        self.__console = _CONSOLE
         self.__interactive_retry = cmd_args.interactive_retry
         self.__doubtful_mode = cmd_args.doubtful_mode
+        # last seen status of the nodes shown to the user
         self.known_nodes = {}
         self.user_chose_to_quit = False
         self.declined_retry_nodes = set()
         self.approved_nodes = set()
         self.console_lock = threading.Lock()
         self.stop_requested = False
+        self._selector = None
+        # second and text of the last formatted timestamp
+        self._tick_timestamp = (None, None)
+        self._last_nodes_hash = None
+        # last nodes list got from the api client, the same object while the backend answers not modified
+        self._last_nodes = None
+        self._wake_event = threading.Event()
+        # in TTY mode the wake ups are written to a pipe too, watched by the selector together with the
+        # standard input while the draw loop runs
+        self._wake_pipe = None
+        self._wake_pipe_lock = threading.Lock()
+        # non interactive output is printed by a dedicated thread
+        self._print_queue = queue.Queue()
+        threading.Thread(target=self._print_worker, daemon=True).start()
 
     def draw_init(self):
         self._logger.debug("Initializing stdout output")
         if self.is_verify_only():
-            self.__console.print("[bold yellow]Running in VERIFY ONLY mode[/]", justify="center")
-        self.__console.print("\n[bold cyan]Press Ctrl+X to stop the workflow or Ctrl+C to detach from the backend[/]\n", justify="center")
-        self.__console.print("[italic]Waiting for workflow to start...[/]", justify="center")
+            self._print("[bold yellow]Running in VERIFY ONLY mode[/]", justify="center")
+        self._print("\n[bold cyan]Press Ctrl+X to stop the workflow or Ctrl+C to detach from the backend[/]\n", justify="center")
+        self._print("[italic]Waiting for workflow to start...[/]", justify="center")
 
         nodes = self.api_client.get_all_nodes()
+        delay = 0.1
+        attempts = 0
         while not nodes:
-            time.sleep(1)
-            nodes = self.api_client.get_all_nodes()
+            # the backend holds the request until the workflow has nodes, checking
+            # every second if detached in the meantime
+            requested = time.monotonic()
+            nodes = self.api_client.wait_for_nodes(timeout=1)
+            if self.event.is_set():
+                return
+            if nodes:
+                break
+            # an older or unreachable backend answers at once, wait with an exponential backoff
+            if self.event.wait(timeout=max(delay - (time.monotonic() - requested), 0)):
+                return
+            delay = min(delay * 1.5, 2, self._refresh_max)
+            attempts += 1
+            if attempts % 5 == 0:
+                self._logger.debug(f"Still waiting for workflow nodes after {attempts} attempts")
 
         # calculate first column size
         maximum_first_colum_width = 0
@@ -53,40 +116,10 @@ class StdoutWorkflowOutput(WorkflowOutput):
         else:
             self.__first_column_width = maximum_first_colum_width
 
-        table = Table(title="Workflow nodes")
-        table.add_column("Node", justify="left", style="cyan", no_wrap=True, width=self.__first_column_width)
-        table.add_column("Playbook", style="bright_magenta")
-        table.add_column("Ref.", style="cyan")
-        table.add_column("Started", style="green")
-        table.add_column("Ended", style="green")
-        table.add_column("Status")
-
-
-        if nodes:
-            for node in nodes:
-                node_type = node.get('type')
-                if node_type in ['playbook', 'info', 'checkpoint']:
-                    self.known_nodes[node['id']] = node
-
-                playbook_col = "-"
-                if node_type == 'playbook':
-                    playbook_col = node.get('playbook', '-')
-                elif node_type == 'info':
-                    playbook_col = f"[dim]({node.get('description', 'Info')})[/dim]"
-                elif node_type == 'checkpoint':
-                    playbook_col = f"[dim]({node.get('description', 'Checkpoint')})[/dim]"
-
-                if node_type in ['playbook', 'info', 'checkpoint']:
-                    table.add_row(
-                        node['id'],
-                        playbook_col,
-                        node.get('reference', '-'),
-                        node.get('started', ''),
-                        node.get('ended', ''),
-                        self._render_status(node['status'])
-                    )
-        self.__console.print(table)
-        self.__console.print("")
+        shown_nodes = self._shown_nodes(nodes)
+        self.known_nodes.update((node['id'], node['status']) for node in shown_nodes)
+        self._print(self._build_recap_table("Workflow nodes", shown_nodes))
+        self._print("")
 
 
         if nodes and self.__interactive_retry:
@@ -95,232 +128,355 @@ class StdoutWorkflowOutput(WorkflowOutput):
                     if node['id'] not in self.declined_retry_nodes:
                         self.handle_retry(node)
 
-        self.__console.print("[italic]Running[/] ...", justify="center")
+        self._print("[italic]Running[/] ...", justify="center")
 
     def draw_step(self):
-        nodes = self.api_client.get_all_nodes()
+        # the nodes and the workflow status of the step are got with a single request
+        state = self.api_client.get_state()
+        nodes = state["nodes"] if state else None
         found_failed_node_to_prompt = False
-        if nodes:
+        # status changes are printed all at once, or right before a prompt to keep the ordering
+        changed_nodes = []
+        failed_status = NodeStatus.FAILED.value
+        awaiting_status = NodeStatus.AWAITING_CONFIRMATION.value
+        # nodes is a plain list of dicts decoded from the backend response
+        known_nodes = self.known_nodes
+
+        # skip the scan when no node changed since the last step, without hashing
+        # them again when the api client returned the same list as last time
+        if nodes is not None and nodes is self._last_nodes and self._last_nodes_hash is not None:
+            nodes_hash = self._last_nodes_hash
+        else:
+            nodes_hash = 0
+            if nodes:
+                for node in nodes:
+                    nodes_hash ^= hash(_get_id_status(node))
+        self._last_nodes = nodes
+        if nodes and nodes_hash != self._last_nodes_hash:
+            # an interaction with the user resets the hash, forcing a new scan on next step
+            self._last_nodes_hash = nodes_hash
             for node in nodes:
-                node_id = node['id']
-                if node_id in self.known_nodes and self.known_nodes[node_id]['status'] != node['status']:
-                    self.print_node_status_change(node)
-                    self.known_nodes[node_id] = node
-
-                if node['status'] == NodeStatus.FAILED.value and self.__interactive_retry and node.get('type') != 'checkpoint':
-                    if node['id'] not in self.declined_retry_nodes:
+                node_id, status = _get_id_status(node)
+                known_status = known_nodes.get(node_id)
+                if known_status is not None and known_status != status:
+                    changed_nodes.append(node)
+                    known_nodes[node_id] = status
+
+                if status == failed_status and self.__interactive_retry and node.get('type') != 'checkpoint':
+                    if node_id not in self.declined_retry_nodes:
+                        self.print_node_status_changes(changed_nodes)
+                        changed_nodes = []
                         self.handle_retry(node)
                         found_failed_node_to_prompt = True
 
-                if node['status'] == NodeStatus.AWAITING_CONFIRMATION.value:
-                    if node['id'] not in self.approved_nodes:
+                if status == awaiting_status:
+                    if node_id not in self.approved_nodes:
                         if node.get('type') == 'checkpoint':
+                            self.print_node_status_changes(changed_nodes)
+                            changed_nodes = []
                             if self.handle_checkpoint_node(node):
-                                return
+                                return self.api_client.get_workflow_status()
                         elif self.__doubtful_mode:
+                            self.print_node_status_changes(changed_nodes)
+                            changed_nodes = []
                             if self.handle_doubtful_node(node):
-                                return
+                                return self.api_client.get_workflow_status()
+            self.print_node_status_changes(changed_nodes)
+            self._idle_ticks = 0
+        else:
+            self._idle_ticks += 1
 
-        status_data = self.api_client.get_workflow_status()
-        if status_data.get('status') == 'failed' and not found_failed_node_to_prompt:
-            self.user_chose_to_quit = True
+        # poll at the minimum interval while the nodes change, slowing down when the workflow is quiet
+        self._refresh_interval = min(self._refresh_min * (1 + self._idle_ticks // 3), self._refresh_max)
 
+        status_data = state["status"] if state else None
+        if status_data and status_data.get('status') == _WORKFLOW_FAILED and not found_failed_node_to_prompt:
+            self.user_chose_to_quit = True
+        return status_data
 
     def draw_pause(self):
-        ''' Non blocking thread wait'''
-        time.sleep(self._refresh_interval)
+        '''
+        Wait for the refresh interval, waking up as soon as a key is pressed,
+        a stop is requested or the output is detached
+        '''
+        if self._selector is not None and self._selector.get_map():
+            self._selector.select(timeout=self._refresh_interval)
+            self._drain_wake_pipe()
+        else:
+            self._wake_event.wait(timeout=self._refresh_interval)
+        self._wake_event.clear()
+
+    def _wake(self):
+        ''' Wake up the draw loop waiting in draw_pause'''
+        self._wake_event.set()
+        with self._wake_pipe_lock:
+            if self._wake_pipe is None:
+                return
+            try:
+                os.write(self._wake_pipe[1], b'\0')
+            except BlockingIOError:
+                # the pipe is full of wake ups not read yet
+                pass
+
+    def _open_wake_pipe(self):
+        wake_pipe = os.pipe()
+        for fd in wake_pipe:
+            os.set_blocking(fd, False)
+        with self._wake_pipe_lock:
+            self._wake_pipe = wake_pipe
+        return wake_pipe[0]
+
+    def _close_wake_pipe(self):
+        with self._wake_pipe_lock:
+            if self._wake_pipe is not None:
+                for fd in self._wake_pipe:
+                    os.close(fd)
+                self._wake_pipe = None
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self._wake_pipe[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def detach(self):
+        ''' Stop the output leaving the workflow running on the backend'''
+        self.event.set()
+        self._wake()
 
     def draw_end(self, status_data: dict = None):
         if status_data:
             errors = status_data.get('validation_errors')
             if errors:
-                self.__console.print("\n[bold red]Workflow validation failed with errors:[/bold red]")
+                self._print("\n[bold red]Workflow validation failed with errors:[/bold red]")
                 for error in errors:
-                    self.__console.print(f"- {error}")
-                self.__console.print("")
+                    self._print(f"- {error}")
+                self._print("")
 
         nodes = self.api_client.get_all_nodes()
-        table = Table(title="Running recap")
+        self._print(self._build_recap_table("Running recap", self._shown_nodes(nodes) if nodes else ()))
+        self._print("")
+        self._logger.debug("stdout output ends")
+
+    def _build_recap_table(self, title, shown_nodes):
+        ''' Build the nodes table filled with the given shown nodes'''
+        table = self._make_nodes_table(title)
+        for row in self._node_rows(shown_nodes):
+            table.add_row(*row)
+        return table
 
+    def _make_nodes_table(self, title):
+        table = Table(title=title)
         table.add_column("Node", justify="left", style="cyan", no_wrap=True, width=self.__first_column_width)
         table.add_column("Playbook", style="bright_magenta")
         table.add_column("Ref.", style="cyan")
         table.add_column("Started", style="green")
         table.add_column("Ended", style="green")
         table.add_column("Status")
-
-        if nodes:
-            for node in nodes:
-                node_type = node.get('type')
-                playbook_col = "-"
-                if node_type == 'playbook':
-                    playbook_col = node.get('playbook', '-')
-                elif node_type == 'info':
-                    playbook_col = f"[dim]({node.get('description', 'Info')})[/dim]"
-                elif node_type == 'checkpoint':
-                    playbook_col = f"[dim]({node.get('description', 'Checkpoint')})[/dim]"
-
-                if node_type in ['playbook', 'info', 'checkpoint']:
-                    table.add_row(
-                        node['id'],
-                        playbook_col,
-                        node.get('reference', '-'),
-                        node.get('started', ''),
-                        node.get('ended', ''),
-                        self._render_status(node['status'])
-                    )
-        self.__console.print(table)
-        self.__console.print("")
-        self._logger.debug("stdout output ends")
+        return table
+
+    def _shown_nodes(self, nodes):
+        ''' Filter the nodes that are shown inside the nodes table'''
+        return [node for node in nodes if node.get('type') in ('playbook', 'info', 'checkpoint')]
+
+    def _node_rows(self, nodes):
+        ''' Build the nodes table rows'''
+        return [(node['id'],
+                 self._playbook_column(node),
+                 node.get('reference', '-'),
+                 node.get('started', ''),
+                 node.get('ended', ''),
+                 self._render_status(node['status'])) for node in nodes]
+
+    def _playbook_column(self, node):
+        node_type = node.get('type')
+        if node_type == 'playbook':
+            return node.get('playbook', '-')
+        default_description = _DEFAULT_DESCRIPTIONS.get(node_type)
+        if default_description is None:
+            return "-"
+        return f"[dim]({node.get('description', default_description)})[/dim]"
 
     def _render_status(self, status):
-        if status == NodeStatus.RUNNING.value:
-            return '[yellow]started[/]'
-        elif status == NodeStatus.ENDED.value:
-            return '[green]completed[/]'
-        elif status == NodeStatus.FAILED.value:
-            return '[bright_red]failed[/]'
-        elif status == NodeStatus.NOT_STARTED.value:
-            return '[white]not started[/]'
-        elif status == NodeStatus.SKIPPED.value:
-            return '[cyan]skipped[/]'
-        elif status == NodeStatus.STOPPED.value:
-            return '[red]stopped[/]'
-        elif status == NodeStatus.AWAITING_CONFIRMATION.value:
-            return '[bold yellow]awaiting confirmation[/]'
-        else:
-            return 'unknown'
+        return _STATUS_TEXT.get(status, _UNKNOWN_STATUS_TEXT)
 
     def handle_doubtful_node(self, node):
-        y_or_n = ''
-        self.__console.line()
-        self.__console.rule("node \[[italic]" + node['id'] +"[/italic]] awaiting confirmation")
-        table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
-        table.add_column(width=(self.__first_column_width+1), justify="right")
-        table.add_column()
-        table.add_row('[bright_magenta]Node[/]',f"[cyan]{node['id']}[/]")
-        table.add_row('[bright_magenta]Reference[/]',node.get('reference', '-'))
-        table.add_row('[bright_magenta]Description[/]',node.get('description', '-'))
-        self.__console.print(table)
-
-        while y_or_n.lower() not in ['y', 'n']:
+        with self._interactive_console():
+            y_or_n = ''
+            self.__console.line()
+            self.__console.rule("node \[[italic]" + node['id'] +"[/italic]] awaiting confirmation")
             table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
-            table.add_column(width=self.__first_column_width)
-            table.add_column(justify="right")
+            table.add_column(width=(self.__first_column_width+1), justify="right")
             table.add_column()
+            table.add_row('[bright_magenta]Node[/]',f"[cyan]{node['id']}[/]")
+            table.add_row('[bright_magenta]Reference[/]',node.get('reference', '-'))
+            table.add_row('[bright_magenta]Description[/]',node.get('description', '-'))
             self.__console.print(table)
-            self.__console.line()
-            y_or_n = Prompt.ask("[white] Do you want to run the node \[{}]? [green]y[/](yes) / [bright_red]n[/](no=skip)".format(node['id']),
-                                console=self.__console,
-                                show_choices=False,
-                                choices=["n","y"])
 
-        self.__console.line()
-        self.__console.rule()
+            prompt_table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
+            prompt_table.add_column(width=self.__first_column_width)
+            prompt_table.add_column(justify="right")
+            prompt_table.add_column()
+            prompt = "[white] Do you want to run the node \[{}]? [green]y[/](yes) / [bright_red]n[/](no=skip)".format(node['id'])
+            while y_or_n.casefold() not in _CONFIRM_CHOICES:
+                self.__console.print(prompt_table)
+                self.__console.line()
+                y_or_n = self._ask_choice(prompt, choices=["n","y"])
+
+            self.__console.line()
+            self.__console.rule()
 
-        if y_or_n.strip().lower() == 'y':
-            self.api_client.approve_node(node['id'])
-        elif y_or_n.strip().lower() == 'n':
-            self.api_client.disapprove_node(node['id'])
+            if y_or_n.strip().lower() == 'y':
+                self.api_client.approve_node(node['id'])
+            elif y_or_n.strip().lower() == 'n':
+                self.api_client.disapprove_node(node['id'])
 
-        self.approved_nodes.add(node['id'])
-        return True
+            self.approved_nodes.add(node['id'])
+            return True
 
     def handle_checkpoint_node(self, node):
-        y_or_n = ''
-        self.__console.line()
-        self.__console.rule(f"Checkpoint Reached: [italic]{node['id']}[/italic]")
+        with self._interactive_console():
+            y_or_n = ''
+            self.__console.line()
+            self.__console.rule(f"Checkpoint Reached: [italic]{node['id']}[/italic]")
 
-        description = node.get('description', 'Do you want to proceed?')
-        if node.get('reference'):
-            description += f"\n[dim]Reference: {node.get('reference')}[/dim]"
+            description = node.get('description', 'Do you want to proceed?')
+            if node.get('reference'):
+                description += f"\n[dim]Reference: {node.get('reference')}[/dim]"
 
-        self.__console.print(description, justify="center")
+            self.__console.print(description, justify="center")
 
-        while y_or_n.lower() not in ['y', 'n']:
-            y_or_n = Prompt.ask("[white]Do you want to continue? [green]y[/](yes) / [bright_red]n[/](no)",
-                                console=self.__console,
-                                show_choices=False,
-                                choices=["n","y"])
+            while y_or_n.casefold() not in _CONFIRM_CHOICES:
+                y_or_n = self._ask_choice("[white]Do you want to continue? [green]y[/](yes) / [bright_red]n[/](no)",
+                                          choices=["n","y"])
 
-        self.__console.line()
-        self.__console.rule()
+            self.__console.line()
+            self.__console.rule()
 
-        if y_or_n.strip().lower() == 'y':
-            self.api_client.approve_node(node['id'])
-        elif y_or_n.strip().lower() == 'n':
-            self.api_client.disapprove_node(node['id'])
+            if y_or_n.strip().lower() == 'y':
+                self.api_client.approve_node(node['id'])
+            elif y_or_n.strip().lower() == 'n':
+                self.api_client.disapprove_node(node['id'])
 
-        self.approved_nodes.add(node['id'])
+            self.approved_nodes.add(node['id'])
 
-    def print_node_status_change(self, node):
-        node_type = node.get('type')
-        status = node.get('status')
-        timestamp = node.get('ended', '')
-
-        if not timestamp:
-             timestamp = datetime.now().strftime('%H:%M:%S')
+    def print_node_status_changes(self, nodes):
+        if not nodes:
+            return
 
         table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
         table.add_column(width=(self.__first_column_width +1), justify="right")
         table.add_column()
 
-        message = ""
-        if node_type == 'info' and status == NodeStatus.ENDED.value:
-            message = f"[bold cyan]INFO:[/] [cyan]{node.get('description', node['id'])}[/]"
-        else:
-            status_text = self._render_status(node['status'])
-            message = f"Node [cyan]{node['id']}[/] is {status_text}"
+        for node in nodes:
+            node_type = node.get('type')
+            status = node.get('status')
+            timestamp = node.get('ended', '')
 
-        table.add_row(timestamp, message)
-        self.__console.print(table)
+            if not timestamp:
+                timestamp = self._get_tick_timestamp()
 
-    def handle_retry(self, node):
-        y_or_n = ''
-        self.__console.line()
-        self.__console.rule("node \[[italic]" + node['id'] +"[/italic]] failed")
-        table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
-        #table.add_column()
-        table.add_column(width=(self.__first_column_width+1), justify="right")
-        table.add_column()
-        table.add_row('[bright_magenta]Node[/]',f"[cyan]{node['id']}[/]")
-        table.add_row('[bright_magenta]Reference[/]',node.get('reference', '-'))
-        table.add_row('[bright_magenta]Description[/]',node.get('description', '-'))
-        self.__console.print(table)
+            if node_type == 'info' and status == _ENDED:
+                message = Text.assemble(("INFO:", "bold cyan"), " ", (node.get('description', node['id']), "cyan"))
+            else:
+                status_text = self._render_status(node['status'])
+                message = Text.assemble("Node ", (node['id'], "cyan"), " is ", status_text)
+
+            table.add_row(Text(timestamp), message)
+        self._print(table)
 
-        while y_or_n.lower() not in ['y', 'n', 's', 'l']:
+    def _get_tick_timestamp(self):
+        ''' Format the current time at most once per second'''
+        now = int(time.time())
+        last_second, last_timestamp = self._tick_timestamp
+        if now != last_second:
+            last_timestamp = time.strftime('%H:%M:%S', time.localtime(now))
+            self._tick_timestamp = (now, last_timestamp)
+        return last_timestamp
+
+    def handle_retry(self, node):
+        with self._interactive_console():
+            y_or_n = ''
+            self.__console.line()
+            self.__console.rule("node \[[italic]" + node['id'] +"[/italic]] failed")
             table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
-            table.add_column(width=self.__first_column_width)
-            table.add_column(justify="right")
+            #table.add_column()
+            table.add_column(width=(self.__first_column_width+1), justify="right")
             table.add_column()
+            table.add_row('[bright_magenta]Node[/]',f"[cyan]{node['id']}[/]")
+            table.add_row('[bright_magenta]Reference[/]',node.get('reference', '-'))
+            table.add_row('[bright_magenta]Description[/]',node.get('description', '-'))
             self.__console.print(table)
+
+            prompt_table = Table(show_header=False, show_footer=False, show_lines=False, show_edge=False)
+            prompt_table.add_column(width=self.__first_column_width)
+            prompt_table.add_column(justify="right")
+            prompt_table.add_column()
+            prompt = "[white] Do you want to restart the node \[{}]? [green]y[/](yes) / [bright_red]n[/](no) / [cyan]s[/](skip) / [bright_magenta]l[/](logs)".format(node['id'])
+            while y_or_n.casefold() not in _RETRY_CHOICES:
+                self.__console.print(prompt_table)
+                self.__console.line()
+                y_or_n = self._ask_choice(prompt, choices=["n","y","s","l"])
+
+                if y_or_n == 'l':
+                    result = self.api_client.get_node_stdout_since(node['id'], 0)
+                    if result and result[0]:
+                        self.__console.line()
+                        self.__console.print(Text.from_ansi(result[0].decode('utf-8', errors='replace')))
             self.__console.line()
-            y_or_n = Prompt.ask("[white] Do you want to restart the node \[{}]? [green]y[/](yes) / [bright_red]n[/](no) / [cyan]s[/](skip) / [bright_magenta]l[/](logs)".format(node['id']),
-                                console=self.__console,
-                                show_choices=False,
-                                choices=["n","y","s","l"])
-
-            if y_or_n == 'l':
-                stdout = self.api_client.get_node_stdout(node['id'])
-                if stdout:
-                    self.__console.line()
-                    self.__console.print(Text.from_ansi(stdout))
-        self.__console.line()
-        self.__console.rule()
-
-        if y_or_n == 'y':
-            self.api_client.restart_node(node['id'])
-        elif y_or_n == 's':
-            self.api_client.skip_node(node['id'])
-        elif y_or_n == 'n':
-            self.declined_retry_nodes.add(node['id'])
+            self.__console.rule()
+
+            if y_or_n == 'y':
+                self.api_client.restart_node(node['id'])
+            elif y_or_n == 's':
+                self.api_client.skip_node(node['id'])
+            elif y_or_n == 'n':
+                self.declined_retry_nodes.add(node['id'])
+
+    def _ask_choice(self, prompt, choices):
+        ''' Ask a single key choice, reading the key without waiting for Enter when possible'''
+        if not sys.stdin.isatty():
+            return Prompt.ask(prompt, console=self.__console, show_choices=False, choices=choices)
+
+        self.__console.print(prompt + " ", end="")
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            choice = sys.stdin.read(1).lower()
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        self.__console.print(choice, markup=False)
+        return choice
+
+    def _print(self, renderable, **kwargs):
+        self._print_queue.put((renderable, kwargs))
+
+    def _print_worker(self):
+        while True:
+            renderable, kwargs = self._print_queue.get()
+            try:
+                with self.console_lock:
+                    self.__console.print(renderable, **kwargs)
+            finally:
+                self._print_queue.task_done()
+
+    @contextlib.contextmanager
+    def _interactive_console(self):
+        ''' Flush the queued output and hold the console while interacting with the user'''
+        self._print_queue.join()
+        self._last_nodes_hash = None
+        with self.console_lock:
+            yield
 
     def _request_stop(self):
         self.stop_requested = True
+        self._wake()
 
     def _handle_stop_request(self):
         self.api_client.pause_workflow()
-        with self.console_lock:
+        with self._interactive_console():
             self.__console.print("\n")
             self.__console.print("[bold yellow]Stop workflow requested.[/]")
             self.__console.print("[bold yellow]Choose stop mode[/]: \\[g][dark_orange]raceful[/], \\[h][red]ard[/], or \\[c][cyan]ancel[/]?")
@@ -337,21 +493,36 @@ class StdoutWorkflowOutput(WorkflowOutput):
                 self.__console.print("[green]Stop request canceled.[/]")
         self.stop_requested = False
 
+    def _watch_node_events(self):
+        ''' Wake up the draw loop each time the backend notifies a nodes change'''
+        while not self.event.is_set():
+            for _ in self.api_client.stream_node_events(self.event):
+                self._wake()
+            # the polling goes on meanwhile, try to open the stream again later
+            self.event.wait(timeout=5)
+
     def run(self):
         self._logger.info("WorkflowOutput run")
         self.draw_init()
+        threading.Thread(target=self._watch_node_events, daemon=True).start()
 
         is_tty = sys.stdin.isatty()
+        self._selector = selectors.DefaultSelector()
         if is_tty:
             old_settings = termios.tcgetattr(sys.stdin)
+            self._selector.register(sys.stdin, selectors.EVENT_READ)
+            self._selector.register(self._open_wake_pipe(), selectors.EVENT_READ)
 
         try:
             if is_tty:
                 tty.setcbreak(sys.stdin.fileno())
 
             status_data = None
-            while not self.event.is_set():
-                if is_tty and select.select([sys.stdin], [], [], 0) == ([sys.stdin], [], []):
+            status = None
+            interactive_retry = self.__interactive_retry
+            event_is_set = self.event.is_set
+            while not event_is_set():
+                if is_tty and any(key.fileobj is sys.stdin for key, _ in self._selector.select(timeout=0)):
                     c = sys.stdin.read(1)
                     if c == '\x18': # Ctrl+X
                         self._request_stop()
@@ -359,23 +530,25 @@ class StdoutWorkflowOutput(WorkflowOutput):
                 if self.stop_requested:
                     self._handle_stop_request()
 
-                status_data = self.api_client.get_workflow_status()
+                # the step returns the workflow status, avoiding a second request per tick
+                status_data = self.draw_step()
                 status = status_data.get('status') if status_data else None
                 self._logger.info(f"Checking status: {status}")
 
-                if status == "ended":
+                if status == _WORKFLOW_ENDED:
                     break
 
-                if status == "failed" and not self._WorkflowOutput__interactive_retry:
+                if status == _WORKFLOW_FAILED and not interactive_retry:
                     break
 
-                self.draw_step()
-
                 if hasattr(self, 'user_chose_to_quit') and self.user_chose_to_quit:
                     break
 
                 self.draw_pause()
         finally:
+            self._selector.close()
+            self._selector = None
+            self._close_wake_pipe()
             if is_tty:
                 termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
 
@@ -383,3 +556,5 @@ class StdoutWorkflowOutput(WorkflowOutput):
         if not self.event.is_set():
             self._logger.info(f"Final status: {status}. Exiting loop.")
             self.draw_end(status_data=status_data)
+        # wait the queued output to be printed before leaving
+        self._print_queue.join()
@@ -1,12 +1,10 @@
 import os
+import codecs
+import functools
 import time
 import threading
-import itertools
+import queue
 from itertools import cycle
-import warnings
-with warnings.catch_warnings():
-    warnings.filterwarnings("ignore", message="networkx backend defined more than once: nx-loopback")
-    import networkx as nx
 from rich.highlighter import Highlighter
 from rich.text import Text
 from rich.pretty import Pretty
@@ -17,13 +15,49 @@ from textual.screen import Screen, ModalScreen
 from textual import work
 from textual.reactive import reactive
 from textual.theme import BUILTIN_THEMES
-from collections import deque
-from textual.css.query import NoMatches
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from .base import WorkflowOutput
-from ..core.models import NodeStatus
+from ..core.models import NodeStatus, WorkflowStatus
 from .api_client import ApiClient
 
 
+# statuses a node does not leave anymore, unless it is relaunched
+_TERMINAL_STATUSES = frozenset((NodeStatus.ENDED.value, NodeStatus.FAILED.value,
+                                NodeStatus.SKIPPED.value, NodeStatus.STOPPED.value))
+# node statuses checked while updating the tree
+_RUNNING = NodeStatus.RUNNING.value
+_FAILED = NodeStatus.FAILED.value
+_AWAITING_CONFIRMATION = NodeStatus.AWAITING_CONFIRMATION.value
+# workflow status checked for the validation errors
+_WORKFLOW_FAILED = WorkflowStatus.FAILED.value
+# seconds between the backend checks once every node is in a terminal status
+_IDLE_POLL_INTERVAL = 5
+# longest seconds between the attempts to open the nodes events stream while it cannot be opened
+_STREAM_RETRY_MAX = 30
+# start and end nodes of the workflow graph, not shown in the tree
+_HIDDEN_NODES = frozenset(('_s', '_e'))
+# seconds waited at the exit for the workers still using the api client
+_WORKERS_EXIT_TIMEOUT = 2
+
+
+def _api_worker(method):
+    ''' Run a worker of the app only before its shutdown, counted so the api client is closed after it'''
+    @functools.wraps(method)
+    def worker(app, *args, **kwargs):
+        with app._api_workers_changed:
+            if app._shutdown_event.is_set():
+                return None
+            app._api_workers += 1
+        try:
+            return method(app, *args, **kwargs)
+        finally:
+            with app._api_workers_changed:
+                app._api_workers -= 1
+                app._api_workers_changed.notify_all()
+    return worker
+
+
 class QuitScreen(ModalScreen):
     """Screen with a dialog to quit."""
 
@@ -134,7 +168,15 @@ class TextualWorkflowOutput(WorkflowOutput):
         This method is called directly from __main__.py for textual mode.
         It launches the Textual app.
         """
-        self.app.run()
+        try:
+            self.app.run()
+        finally:
+            # the workers leave at the shutdown event, their connections are not needed anymore once they are over.
+            # The nodes events stream is only read until its next line, without new requests after the shutdown
+            self.app._shutdown_event.set()
+            if not self.app.wait_api_workers(_WORKERS_EXIT_TIMEOUT):
+                self._logger.debug("Closing the api client with workers still running")
+            self.api_client.close()
 
     # The following methods are not used in Textual mode as the app handles the loop.
     def draw_init(self): pass
@@ -171,8 +213,13 @@ class TextualWorkflowOutput(WorkflowOutput):
                 pass
             self.tree_nodes = {}
             self.node_data = {}
-            self.graph = nx.DiGraph()
+            # read only adjacency of the workflow tree: node id -> children ids
+            self.graph = defaultdict(list)
             self.spinner_icons = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
+            self._spinner_frames = [f"[yellow]{icon_char}[/yellow]" for icon_char in self.spinner_icons]
+            # (tree node, label of each spinner frame) of each node
+            self._spinners = {}
+            self._spinner_index = 0
             self.approved_nodes = set()
             self.status_icons = {
                 NodeStatus.NOT_STARTED.value: "○",
@@ -184,17 +231,38 @@ class TextualWorkflowOutput(WorkflowOutput):
                 NodeStatus.SKIPPED.value: "[cyan]»[/cyan]",
                 NodeStatus.STOPPED.value: "[red]■[/red]",
             }
-            # This dictionary now only serves as a flag to indicate if a spinner worker
-            # has been started for a node, to prevent duplicates.
+            # The running nodes animated by the spinner timer
             self.active_spinners = set()
-            self.stdout_watcher = None
+            # latest stdout request, (node id, watch), for the single stdout worker
+            self._stdout_requests = queue.Queue(maxsize=1)
             self._shutdown_event = threading.Event()
+            # workers using the api client, waited before closing it
+            self._api_workers = 0
+            self._api_workers_changed = threading.Condition()
             self.action_buttons = None
             self.stdout_log = None
             self.details_table = None
             self._node_tree = None
+            self.status_bar = None
             self.doubtful_node_queue = deque()
             self.pending_confirmation_nodes = set()
+            # latest nodes received from the backend, shared by all the watchers
+            self._nodes_snapshot = {}
+            # node whose stdout is followed, and the event waking its watcher up
+            self._watched_node_id = None
+            self._stdout_wake = threading.Event()
+            # (status, type) of the label last applied to each tree node
+            self._last_label_key = {}
+            # label string last set on each tree node, only read and written by the UI thread
+            self._applied_labels = {}
+            # status of each node at the last update of the tree
+            self._prev_statuses = {}
+            self._tree_ready = False
+            # true when all the executable nodes are in a terminal status
+            self._workflow_terminal = False
+            self._next_status_check = 0
+            # tree labels already formatted, by (node id, type, status)
+            self._labels = {}
 
         def compose(self) -> ComposeResult:
             yield Header()
@@ -212,19 +280,26 @@ class TextualWorkflowOutput(WorkflowOutput):
             yield Footer()
 
         def watch_status_message(self, message: str) -> None:
-            try:
-                status_bar = self.query_one("#status_bar", Static)
-                status_bar.update(message)
-            except NoMatches:
-                pass
+            # the watcher can fire before the widgets are mounted
+            if self.status_bar is not None:
+                self.status_bar.update(message)
 
         @work(thread=True)
+        @_api_worker
         def update_status(self):
-            if self.api_client.check_health():
+            # once the workflow is over, check the backend less often
+            if self._workflow_terminal:
+                now = time.monotonic()
+                if now < self._next_status_check:
+                    return
+                self._next_status_check = now + _IDLE_POLL_INTERVAL
+
+            # a status answered by the backend also tells it is connected
+            workflow_status = self.api_client.get_workflow_status()
+            if workflow_status is not None:
                 self.status_message = "[green]Backend: Connected[/green]"
 
-                workflow_status = self.api_client.get_workflow_status()
-                if workflow_status and workflow_status.get('status') == 'failed':
+                if workflow_status.get('status') == _WORKFLOW_FAILED:
                     errors = workflow_status.get('validation_errors')
                     if errors:
                         self.status_message = f"[bold red]Validation Error:[/bold red] {errors[0]}"
@@ -237,9 +312,17 @@ class TextualWorkflowOutput(WorkflowOutput):
             self.stdout_log = self.query_one("#playbook_stdout", RichLog)
             self.details_table = self.query_one("#node_details", DataTable)
             self._node_tree = self.query_one(Tree)
+            self.status_bar = self.query_one("#status_bar", Static)
             self.initial_setup()
             self.set_interval(1, self.update_status)
-            self.set_interval(0.5, self.update_node_statuses)
+            self.poll_node_statuses()
+            self.set_interval(0.1, self.animate_spinners)
+            self.stdout_viewer()
+
+        def wait_api_workers(self, timeout: float) -> bool:
+            """Wait up to the given seconds for the workers using the api client, telling if all of them are over."""
+            with self._api_workers_changed:
+                return self._api_workers_changed.wait_for(lambda: self._api_workers == 0, timeout=timeout)
 
         def action_quit(self) -> None:
             """Called when the user quits the application."""
@@ -302,22 +385,26 @@ class TextualWorkflowOutput(WorkflowOutput):
             self.app.theme = next(self.theme_cycle)
 
         def get_running_nodes(self):
-            running_nodes = []
-            for node_id, node_data in self.node_data.items():
-                if node_data.get('status') == NodeStatus.RUNNING.value:
-                    running_nodes.append(node_id)
-            return running_nodes
+            # the running nodes are already tracked for the spinners, just drop
+            # the ones the spinner timer has not discarded yet
+            node_data = self.node_data
+            return [node_id for node_id in self.active_spinners
+                    if node_data.get(node_id, {}).get('status') == _RUNNING]
 
         @work(thread=True)
+        @_api_worker
         def initial_setup(self):
-            # Fetch graph and node data once
-            edges = self.api_client.get_workflow_graph()
+            # Fetch graph and node data once, the two requests are independent
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                edges_future = executor.submit(self.api_client.get_workflow_graph)
+                nodes_future = executor.submit(self.api_client.get_all_nodes)
+                edges = edges_future.result()
+                nodes = nodes_future.result()
+
             if edges is not None:
-                self.graph.add_edges_from(edges)
-            if "_root" not in self.graph:
-                self.graph.add_node("_root")
+                for parent_id, child_id in edges:
+                    self.graph[parent_id].append(child_id)
 
-            nodes = self.api_client.get_all_nodes()
             if nodes is not None:
                 for node in nodes:
                     self.node_data[node['id']] = node
@@ -331,75 +418,141 @@ class TextualWorkflowOutput(WorkflowOutput):
                 self.tree_nodes[root_node_id] = root_node
                 self._build_tree(root_node_id, root_node)
                 self._node_tree.root.expand_all()
+                self._tree_ready = True
 
             self.call_from_thread(build_initial_tree)
 
         def _build_tree(self, node_id, tree_node):
-            for child_id in self.graph.successors(node_id):
-                if child_id in ['_s', '_e']:
-                    continue
-
-                child_node_data = self.node_data.get(child_id, {})
-                node_type = child_node_data.get('type')
-
-                allow_expand = node_type == 'block'
+            # breadth first visit, adding the children of each node in order
+            successors = self.graph
+            node_data = self.node_data
+            tree_nodes = self.tree_nodes
+            to_be_visited = deque([(node_id, tree_node)])
+            while to_be_visited:
+                parent_id, parent_tree_node = to_be_visited.popleft()
+                for child_id in successors.get(parent_id, ()):
+                    if child_id in _HIDDEN_NODES:
+                        continue
+
+                    child_node_data = node_data.get(child_id, {})
+                    node_type = child_node_data.get('type')
+
+                    allow_expand = node_type == 'block'
+                    label = self._get_label(child_id, node_type, child_node_data.get('status'))
+
+                    child_tree_node = parent_tree_node.add(label, data=child_id, allow_expand=allow_expand)
+                    tree_nodes[child_id] = child_tree_node
+
+                    if successors.get(child_id):
+                        to_be_visited.append((child_id, child_tree_node))
+
+        def _get_label(self, node_id, node_type, status):
+            """Return the tree label of a node, formatting it only the first time."""
+            key = (node_id, node_type, status)
+            label = self._labels.get(key)
+            if label is None:
                 if node_type == 'block':
-                    label = f"[b]{child_id}[/b]"
+                    label = f"[b]{node_id}[/b]"
                 elif node_type == 'info':
-                    label = f"[cyan]i[/] {child_id}"
+                    label = f"[cyan]i[/] {node_id}"
                 else:
-                    icon = self.status_icons.get(child_node_data.get('status'), " ")
-                    label = f"{icon} {child_id}"
-
-                child_tree_node = tree_node.add(label, data=child_id, allow_expand=allow_expand)
-                self.tree_nodes[child_id] = child_tree_node
-
-                if self.graph.out_degree(child_id) > 0:
-                    self._build_tree(child_id, child_tree_node)
+                    icon = self.status_icons.get(status, " ")
+                    label = f"{icon} {node_id}"
+                self._labels[key] = label
+            return label
 
         @work(thread=True, exclusive=True)
+        @_api_worker
+        def poll_node_statuses(self):
+            """
+            Single consumer of the nodes statuses. The nodes are received from the
+            backend events stream as soon as they change; if the stream is not
+            available, they are polled until the stream can be opened again, the
+            next request being scheduled only after the previous one is completed.
+            The stream is opened again with a delay increasing while it fails.
+            """
+            stream_failures = 0
+            while not self._shutdown_event.is_set():
+                # the stream sends the nodes as soon as it is opened
+                stream_opened = False
+                for nodes in self.api_client.stream_node_events(self._shutdown_event):
+                    stream_opened = True
+                    self.apply_node_statuses(nodes)
+                if self._shutdown_event.is_set():
+                    break
+                stream_failures = 0 if stream_opened else min(stream_failures + 1, 6)
+                stream_retry = time.monotonic() + min(0.5 * 2 ** stream_failures, _STREAM_RETRY_MAX)
+                while True:
+                    self.update_node_statuses()
+                    remaining = stream_retry - time.monotonic()
+                    poll_interval = _IDLE_POLL_INTERVAL if self._workflow_terminal else 0.5
+                    if remaining <= 0 or self._shutdown_event.wait(min(remaining, poll_interval)):
+                        break
+
         def update_node_statuses(self):
-            # Sanitize the data from the API to prevent processing duplicate statuses
-            nodes_from_api = self.api_client.get_all_nodes()
+            # only the changed nodes are received, merged into the ones already known
+            nodes_from_api = self.api_client.get_nodes_changes()
             if nodes_from_api is None:
                 return
+            self.apply_node_statuses(nodes_from_api)
+
+        def apply_node_statuses(self, nodes_from_api):
+            # Sanitize the data from the API to prevent processing duplicate statuses
             final_node_states = {node['id']: node for node in nodes_from_api}
+            self._nodes_snapshot = final_node_states
 
-            nodes_need_approval = False
+            # the central data store gets every field received, the statuses only decide the labels to redraw
+            tree_nodes = self.tree_nodes
+            node_data_store = self.node_data
             for node_id, node in final_node_states.items():
-                if node_id in self.tree_nodes and node_id != "_root":
-                    # Update the central data store
-                    self.node_data[node_id] = node
+                if node_id in tree_nodes and node_id != "_root":
+                    node_data_store[node_id] = node
 
-                    tree_node = self.tree_nodes[node_id]
-                    status = node['status']
+            # nothing else to do if no status changed since the last update of the whole tree
+            statuses = {node_id: node['status'] for node_id, node in final_node_states.items()}
+            prev_statuses = self._prev_statuses
+            if statuses == prev_statuses:
+                return
+            changed_ids = [node_id for node_id, status in statuses.items() if prev_statuses.get(node_id) != status]
+            watched_node_id = self._watched_node_id
+            if watched_node_id is not None and prev_statuses.get(watched_node_id) != statuses.get(watched_node_id):
+                self._stdout_wake.set()
+            if self._tree_ready:
+                self._prev_statuses = statuses
+            executable_statuses = [node['status'] for node in final_node_states.values()
+                                   if node.get('type') not in ('block', 'info')]
+            self._workflow_terminal = bool(executable_statuses) and all(
+                status in _TERMINAL_STATUSES for status in executable_statuses)
 
-                    if status == NodeStatus.RUNNING.value:
-                        # If a spinner isn't already running for this node, start one.
-                        if node_id not in self.active_spinners:
-                            self.active_spinners.add(node_id)
-                            self.update_spinner(tree_node, node)
-                    else:
+            nodes_need_approval = False
+            labels = []
+            last_label_key = self._last_label_key
+            for node_id in changed_ids:
+                node = final_node_states[node_id]
+                if node_id in tree_nodes and node_id != "_root":
+                    tree_node = tree_nodes[node_id]
+                    status = node['status']
+                    label_key = (status, node.get('type'))
+                    label_changed = last_label_key.get(node_id) != label_key
+                    last_label_key[node_id] = label_key
+
+                    if status == _RUNNING:
+                        # The spinner timer animates all the nodes in this set
+                        self.active_spinners.add(node_id)
+                    elif label_changed:
                         # For any non-running state, we are the source of truth.
                         # The spinner, if it exists, will see the state change and stop itself.
                         # We just set the final label.
-                        if node.get('type') == 'block':
-                            label = f"[b]{node_id}[/b]"
-                        elif node.get('type') == 'info':
-                            label = f"[cyan]i[/] {node_id}"
-                        else:
-                            icon = self.status_icons.get(status, " ")
-                            label = f"{icon} {node_id}"
-                        self.call_from_thread(tree_node.set_label, label)
+                        labels.append((tree_node, self._get_label(node_id, node.get('type'), status)))
 
                     # If the updated node is the one currently selected, refresh the action buttons
                     if node_id == self.selected_node_id:
-                        if status == NodeStatus.FAILED.value and node.get('type') == 'playbook':
+                        if status == _FAILED and node.get('type') == 'playbook':
                             self.call_from_thread(self._set_widget_display, self.action_buttons, True)
                         else:
                             self.call_from_thread(self._set_widget_display, self.action_buttons, False)
 
-                    if status == NodeStatus.AWAITING_CONFIRMATION.value:
+                    if status == _AWAITING_CONFIRMATION:
                         if node_id not in self.approved_nodes and node_id not in self.pending_confirmation_nodes:
                             self.pending_confirmation_nodes.add(node_id)
                             message = f"Node [b]{node_id}[/b] is awaiting your confirmation."
@@ -410,13 +563,14 @@ class TextualWorkflowOutput(WorkflowOutput):
                             self.doubtful_node_queue.append((node_id, message, disapprove_label))
                             nodes_need_approval = True
 
+            if labels:
+                self.call_from_thread(self._set_labels, labels)
             if nodes_need_approval:
                 self.call_from_thread(self._process_doubtful_queue)
 
         def on_tree_node_selected(self, event: Tree.NodeSelected) -> None:
-            if self.stdout_watcher:
-                self.stdout_watcher.cancel()
-                self.stdout_watcher = None
+            # stop following the stdout of the previously selected node
+            self._request_stdout(None)
 
             node_id = event.node.data
             self.selected_node_id = node_id
@@ -431,8 +585,11 @@ class TextualWorkflowOutput(WorkflowOutput):
                 self.details_table.add_column("Property", width=20)
                 self.details_table.add_column("Value")
 
+            # rows are collected and added in one pass once the node is inspected
+            rows = []
+
             def add_detail(key, value):
-                self.details_table.add_row(key, value, height=None)
+                rows.append((key, value))
 
             add_detail("Node", node_data.get('id'))
             if node_data.get('type') == 'playbook':
@@ -449,9 +606,7 @@ class TextualWorkflowOutput(WorkflowOutput):
                     add_detail("Description", node_data.get('description', 'CCC'))
                 if node_data.get('extravars', False):
                     add_detail("Variables", Pretty(node_data.get('extravars', {}), indent_guides=True, expand_all=False))
-                self.show_stdout(node_id)
-                if node_data['status'] == NodeStatus.RUNNING.value:
-                    self.stdout_watcher = self.watch_stdout(node_id)
+                self._request_stdout(node_id, watch=node_data['status'] == _RUNNING)
             elif node_data.get('type') == 'block':
                 add_detail("Type", "Block")
                 add_detail("Child strategy", node_data.get('strategy'))
@@ -469,7 +624,10 @@ class TextualWorkflowOutput(WorkflowOutput):
                 if node_data.get('reference'):
                     add_detail("Reference", node_data.get('reference'))
 
-            if node_data.get('status') == NodeStatus.FAILED.value and node_data.get('type') == 'playbook':
+            for key, value in rows:
+                self.details_table.add_row(key, value, height=None)
+
+            if node_data.get('status') == _FAILED and node_data.get('type') == 'playbook':
                 self.action_buttons.display = True
             else:
                 self.action_buttons.display = False
@@ -479,78 +637,137 @@ class TextualWorkflowOutput(WorkflowOutput):
             if self.selected_node_id:
                 if event.button.id == "relaunch_button":
                     self.api_client.restart_node(self.selected_node_id)
-                    # Clear the log and start watching for new output
-                    self.stdout_log.clear()
-                    if self.stdout_watcher:
-                        self.stdout_watcher.cancel()
-                    self.stdout_watcher = self.watch_stdout(self.selected_node_id)
+                    # Start watching for new output
+                    self._request_stdout(self.selected_node_id, watch=True)
                 elif event.button.id == "skip_button":
                     self.api_client.skip_node(self.selected_node_id)
 
             # Hide buttons after action
             self.action_buttons.display = False
 
-        @work(exclusive=True, thread=True)
-        def watch_stdout(self, node_id: str):
-            last_content = self.api_client.get_node_stdout(node_id)
-            if last_content is None:
-                return
-
-            while not self._shutdown_event.is_set():
-                time.sleep(0.5)
-                current_stdout = self.api_client.get_node_stdout(node_id)
-                if current_stdout is None:
-                    break
-                if current_stdout != last_content:
-                    new_content = current_stdout[len(last_content):]
-                    text = Text.from_ansi(new_content)
-                    self.call_from_thread(self.stdout_log.write, text)
-                    last_content = current_stdout
-
-                status_response = self.api_client.get_all_nodes()
-                if status_response is None:
-                    break
-                node_status = next((n['status'] for n in status_response if n['id'] == node_id), None)
-                if node_status != NodeStatus.RUNNING.value:
-                    break
+        def _request_stdout(self, node_id, watch=False):
+            """Asks the stdout worker to display a node output, replacing any request not yet served."""
+            try:
+                self._stdout_requests.get_nowait()
+            except queue.Empty:
+                pass
+            self._stdout_requests.put_nowait((node_id, watch))
+            self._stdout_wake.set()
 
         @work(thread=True)
-        def update_spinner(self, tree_node, node_data):
+        @_api_worker
+        def stdout_viewer(self):
             """
-            This worker is now self-terminating. It spins as long as the node's
-            status is 'running' in the central self.node_data store.
+            Single worker displaying the stdout of the selected node. A new request
+            interrupts the one being served, so no thread is spawned per selection.
             """
-            spinner_cycle = itertools.cycle(self.spinner_icons)
-            node_id = node_data['id']
+            while not self._shutdown_event.is_set():
+                try:
+                    node_id, watch = self._stdout_requests.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if node_id is None:
+                    continue
+                if watch:
+                    self.watch_stdout(node_id)
+                else:
+                    self.show_stdout(node_id)
 
-            while self.node_data.get(node_id, {}).get('status') == NodeStatus.RUNNING.value and not self._shutdown_event.is_set():
-                icon_char = next(spinner_cycle)
-                icon = f"[yellow]{icon_char}[/yellow]"
+        def _stdout_superseded(self):
+            return self._shutdown_event.is_set() or not self._stdout_requests.empty()
 
-                # Use the original node_data for static info like type and id
-                if node_data.get('type') == 'block':
-                    label = f"{icon} [b]{node_id}[/b]"
-                else:
-                    label = f"{icon} {node_id}"
+        def watch_stdout(self, node_id: str):
+            """Displays the stdout of a running node, fetching only the output not yet received."""
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            offset = 0
+            # the last line received, until it is terminated by a newline
+            partial_line = ""
+            get_stdout_since = self.api_client.get_node_stdout_since
+            stdout_wake = self._stdout_wake
+            self._watched_node_id = node_id
+            self.call_from_thread(self.stdout_log.clear)
+
+            while not self._stdout_superseded():
+                stdout_wake.clear()
+                # check the status before fetching, so the last output is always received
+                node_status = self._nodes_snapshot.get(node_id, {}).get('status')
+                result = get_stdout_since(node_id, offset)
+                if result is None:
+                    break
+                chunk, offset = result
+                if chunk:
+                    lines = (partial_line + decoder.decode(chunk)).split("\n")
+                    partial_line = lines.pop()
+                    if lines:
+                        self.call_from_thread(self._write_lines, self._parse_lines(lines))
+
+                if node_status != _RUNNING:
+                    break
+                # fetch again in a while, or as soon as the status changes
+                stdout_wake.wait(timeout=0.5)
 
-                # Final check to prevent a race condition where the status changes
-                # between the while-check and this set_label call.
-                if self.node_data.get(node_id, {}).get('status') == NodeStatus.RUNNING.value:
-                    self.call_from_thread(tree_node.set_label, label)
+            self._watched_node_id = None
+            if partial_line and not self._stdout_superseded():
+                self.call_from_thread(self._write_lines, self._parse_lines([partial_line]))
 
-                time.sleep(0.1)
+        @staticmethod
+        def _parse_lines(lines):
+            """Parses the ANSI codes of the lines in the worker thread."""
+            return [Text.from_ansi(line) for line in lines]
 
-            # The loop has ended, meaning the node is no longer running.
-            # The main update_node_statuses loop is now responsible for setting the
-            # final label. This worker just needs to clean up its flag.
-            if node_id in self.active_spinners:
-                self.active_spinners.remove(node_id)
+        def _write_lines(self, texts):
+            for text in texts:
+                self.stdout_log.write(text)
+
+        def animate_spinners(self):
+            """
+            Timer animating the spinners of all the running nodes, on the UI thread.
+            A node spins as long as its status is 'running' in the central
+            self.node_data store.
+            """
+            if not self.active_spinners:
+                return
+            frame = self._spinner_index = (self._spinner_index + 1) % len(self._spinner_frames)
+            spinners = self._spinners
+            labels = []
+            for node_id in list(self.active_spinners):
+                node_data = self.node_data.get(node_id, {})
+                if node_data.get('status') != _RUNNING:
+                    # The node is no longer running: the final label has already been set
+                    # by apply_node_statuses, but a last frame could have overwritten it,
+                    # so set it again after the frames of this timer.
+                    self.active_spinners.discard(node_id)
+                    labels.append((self.tree_nodes[node_id],
+                                   self._get_label(node_id, node_data.get('type'), node_data.get('status'))))
+                    continue
+
+                spinner = spinners.get(node_id)
+                if spinner is None:
+                    if node_data.get('type') == 'block':
+                        template = f"{{}} [b]{node_id}[/b]"
+                    else:
+                        template = f"{{}} {node_id}"
+                    spinner = spinners[node_id] = (self.tree_nodes[node_id],
+                                                   tuple(template.format(icon) for icon in self._spinner_frames))
+                tree_node, frame_labels = spinner
+                labels.append((tree_node, frame_labels[frame]))
+
+            self._set_labels(labels)
+
+        def _set_labels(self, labels):
+            # a single repaint of the tree for all the labels, skipping the labels already shown
+            applied_labels = self._applied_labels
+            with self.batch_update():
+                for tree_node, label in labels:
+                    if applied_labels.get(tree_node.id) != label:
+                        applied_labels[tree_node.id] = label
+                        tree_node.set_label(label)
 
-        @work(exclusive=True, thread=True)
         def show_stdout(self, node_id: str):
             """Reads and displays the entire stdout for a given node."""
             self.call_from_thread(self.stdout_log.clear)
-            stdout = self.api_client.get_node_stdout(node_id)
-            if stdout is not None:
-                text = Text.from_ansi(stdout)
-                self.call_from_thread(self.stdout_log.write, text)
+            # fetched as raw bytes, saving the JSON encoding and decoding of the whole output
+            result = self.api_client.get_node_stdout_since(node_id, 0)
+            if result is not None and not self._stdout_superseded():
+                stdout = result[0].decode('utf-8', errors='replace')
+                self.call_from_thread(self._write_lines, self._parse_lines(stdout.splitlines()))
@@ -0,0 +1,20 @@
+import unittest
+
+from ansible_plan.ui.api_client import ApiClient
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api_client = ApiClient('http://127.0.0.1:8000')
+        self.addCleanup(self.api_client.close)
+
+    def test_pool_limits_are_applied(self):
+        pool = self.api_client.client._transport._pool
+        self.assertEqual(pool._max_connections, 8)
+        self.assertEqual(pool._max_keepalive_connections, 4)
+        self.assertEqual(pool._keepalive_expiry, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import tempfile
+import threading
+import time
+import types
+import unittest
+from datetime import datetime
+
+from ansible_plan.core.engine import AnsibleWorkflow
+from ansible_plan.core.models import BNode, NodeStatus, PNode
+
+
+class EndingPNode(PNode):
+    ''' A playbook node whose run ends at once, without launching ansible runner'''
+
+    def check_node_input(self):
+        pass
+
+    def run(self):
+        self.set_started_time(datetime.now())
+        self._on_runner_finished(types.SimpleNamespace(status='successful'))
+
+
+class FailingLaunchPNode(PNode):
+    ''' A playbook node whose run cannot be started'''
+
+    def check_node_input(self):
+        pass
+
+    def run(self):
+        raise RuntimeError('cannot start the playbook')
+
+
+class WorkflowTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.logging_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.logging_dir.cleanup)
+
+    def _run_until_ended(self, workflow, node_id, timeout=10):
+        ''' Run the workflow until the node is ended or the timeout expires, then stop it'''
+        run_thread = threading.Thread(target=workflow.run, daemon=True)
+        run_thread.start()
+        deadline = time.monotonic() + timeout
+        while workflow.get_node_object(node_id).get_status() != NodeStatus.ENDED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        workflow.stop()
+        run_thread.join(timeout=timeout)
+
+
+class SkippedNodeTest(WorkflowTestCase):
+
+    def _serial_workflow(self, node_ids):
+        workflow = AnsibleWorkflow('workflow.yml', self.logging_dir.name, 'info')
+        workflow.add_node(BNode('_s'))
+        for node_id in node_ids:
+            workflow.add_node(EndingPNode(node_id, 'playbook.yml', 'inventory', self.logging_dir.name))
+        workflow.add_node(BNode('_e'))
+        chain = ['_s'] + node_ids + ['_e']
+        workflow.add_links(zip(chain, chain[1:]))
+        return workflow
+
+    def test_nodes_after_a_skipped_node_are_run(self):
+        workflow = self._serial_workflow(['a', 'b', 'c'])
+        workflow.set_skipped_nodes(['b'])
+
+        self._run_until_ended(workflow, 'c')
+
+        self.assertEqual(workflow.get_node_object('a').get_status(), NodeStatus.ENDED)
+        self.assertEqual(workflow.get_node_object('b').get_status(), NodeStatus.SKIPPED)
+        self.assertEqual(workflow.get_node_object('c').get_status(), NodeStatus.ENDED)
+
+
+class FailedLaunchTest(WorkflowTestCase):
+
+    def test_failed_launch_frees_its_running_slot(self):
+        workflow = AnsibleWorkflow('workflow.yml', self.logging_dir.name, 'info')
+        workflow.set_max_running_playbooks(1)
+        workflow.add_node(BNode('_s'))
+        workflow.add_node(FailingLaunchPNode('a', 'playbook.yml', 'inventory', self.logging_dir.name))
+        workflow.add_node(EndingPNode('b', 'playbook.yml', 'inventory', self.logging_dir.name))
+        workflow.add_node(BNode('_e'))
+        workflow.add_links([('_s', 'a'), ('_s', 'b'), ('a', '_e'), ('b', '_e')])
+
+        self._run_until_ended(workflow, 'b')
+
+        self.assertEqual(workflow.get_node_object('a').get_status(), NodeStatus.FAILED)
+        self.assertEqual(workflow.get_node_object('b').get_status(), NodeStatus.ENDED)
+
+
+if __name__ == '__main__':
+    unittest.main()